@@ -1,4 +1,3 @@
-import datetime
 from typing import Annotated
 from uuid import UUID
 
@@ -7,11 +6,13 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+import config
 from accounts.db import get_user_by_uuid, user_with_email_exists, create_user, update_user_email, update_user_full_name, \
     update_user_password, update_user_password_by_email
 from accounts.dependencies import get_current_user_or_401, get_current_user_uuid_or_401
-from accounts.models import UserDTO
-from accounts.utils import authenticate, hash_password, send_confirm_email, pre_send_confirm_email_check, check_password
+from accounts.models import UserDTO, TokenDTO, EmailTaskDTO, EmailStatusDTO
+from accounts.utils import authenticate, hash_password, send_confirm_email, pre_send_confirm_email_check, check_password, \
+    encode_access_token
 from db import get_async_session
 from db.models import User
 from mail import send_email
@@ -20,7 +21,7 @@ from utils import encode_jwt, decode_jwt
 router = APIRouter(prefix='/accounts')
 
 
-@router.post('/login')
+@router.post('/login', response_model=TokenDTO)
 async def login(
         form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
         db_session: Annotated[AsyncSession, Depends(get_async_session)]
@@ -28,11 +29,10 @@ async def login(
     user = await authenticate(db_session, form_data.username, form_data.password)
     if user is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Incorrect username or password')
-    token = encode_jwt({'user_uuid': user.uuid.hex}, datetime.timedelta(days=60))
-    return {'token_type': 'bearer', 'access_token': token}
+    return TokenDTO(token_type='bearer', access_token=encode_access_token(user))
 
 
-@router.post('/signup')
+@router.post('/signup', response_model=EmailTaskDTO)
 async def signup(
         full_name: Annotated[str, Form()],
         email: Annotated[str, Form()],
@@ -43,10 +43,10 @@ async def signup(
     await pre_send_confirm_email_check(db_session, confirm_email_url, email)
     password_hash = await hash_password(password)
     user_uuid = await create_user(db_session, full_name, password_hash)
-    send_confirm_email(confirm_email_url, user_uuid, email)
+    return EmailTaskDTO(email_task_id=send_confirm_email(confirm_email_url, user_uuid, email))
 
 
-@router.post('/confirm_email')
+@router.post('/confirm_email', response_model=None)
 async def confirm_email(
         token: Annotated[str, Body(embed=True)],
         db_session: Annotated[AsyncSession, Depends(get_async_session)]
@@ -64,7 +64,7 @@ async def get_profile(user: Annotated[User, Depends(get_current_user_or_401)]):
     return user
 
 
-@router.patch('/profile/update')
+@router.patch('/profile/update', response_model=None)
 async def update_profile(
         user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)],
         db_session: Annotated[AsyncSession, Depends(get_async_session)],
@@ -84,7 +84,7 @@ async def update_profile(
         await update_user_full_name(db_session, user_uuid, full_name)
 
 
-@router.post('/change_password')
+@router.post('/change_password', response_model=None)
 async def change_password(
         user: Annotated[User, Depends(get_current_user_or_401)],
         old_password: Annotated[str, Body()],
@@ -98,7 +98,7 @@ async def change_password(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='wrong password')
 
 
-@router.post('/reset_password')
+@router.post('/reset_password', response_model=EmailTaskDTO)
 async def reset_password(
         email: Annotated[str, Body(embed=True)],
         confirm_email_url: Annotated[str, Query()],
@@ -107,11 +107,21 @@ async def reset_password(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='confirm_email_url should include $TOKEN$')
     token = encode_jwt({'email': email}, 60 * 60 * 2)
     url = confirm_email_url.replace('$TOKEN$', token)
-    send_email.delay(email, f'someone asked for resetting password in internetshop. If it weren\'t'
-                            f'you, ignore the email. To reset password follow this link: {url}')
+    result = send_email.delay(email, f'someone asked for resetting password in internetshop. If it weren\'t'
+                                     f'you, ignore the email. To reset password follow this link: {url}')
+    return EmailTaskDTO(email_task_id=result.id)
 
 
-@router.post('/confirm_reset_password')
+@router.get('/email_status/{task_id}', response_model=EmailStatusDTO)
+async def get_email_status(task_id: str):
+    """Status of email sent by signup or reset_password: PENDING (unknown or not sent yet), STARTED, SUCCESS or
+    FAILURE. Available only if celery result backend is configured"""
+    if config.CELERY_RESULT_BACKEND is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Email status is not tracked')
+    return EmailStatusDTO(status=send_email.AsyncResult(task_id).state)
+
+
+@router.post('/confirm_reset_password', response_model=None)
 async def confirm_reset_password(
         token: Annotated[str, Body()],
         password: Annotated[str, Body()],
@@ -3,7 +3,7 @@ from uuid import UUID
 from sqlalchemy import select, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import User
+from db.models import User, UserRole
 
 
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
@@ -20,6 +20,15 @@ async def get_user_by_uuid(session: AsyncSession, uuid: UUID) -> User | None:
     return await session.get(User, uuid)
 
 
+async def get_user_claims(session: AsyncSession, uuid: UUID) -> tuple[int, UserRole, UUID | None, UUID | None] | None:
+    """Current values of access token claims (see accounts.utils.encode_access_token)"""
+    res = await session.execute(
+        select(User.token_version, User.role, User.warehouse_uuid, User.delivery_car_uuid).where(User.uuid == uuid)
+    )
+    row = res.first()
+    return None if row is None else tuple(row)
+
+
 async def create_user(session: AsyncSession, full_name: str, password_hash: str) -> UUID:
     res = await session.execute(insert(User).values({
         'full_name': full_name,
@@ -40,10 +49,16 @@ async def update_user_full_name(session: AsyncSession, user_uuid: UUID, full_nam
 
 
 async def update_user_password(session: AsyncSession, user_uuid: UUID, password_hash: str) -> None:
-    await session.execute(update(User).where(User.uuid == user_uuid).values({'password_hash': password_hash}))
+    await session.execute(update(User).where(User.uuid == user_uuid).values({
+        'password_hash': password_hash,
+        'token_version': User.token_version + 1
+    }))
     await session.commit()
 
 
 async def update_user_password_by_email(session: AsyncSession, email: str, password_hash: str) -> None:
-    await session.execute(update(User).where(User.email == email).values({'password_hash': password_hash}))
+    await session.execute(update(User).where(User.email == email).values({
+        'password_hash': password_hash,
+        'token_version': User.token_version + 1
+    }))
     await session.commit()
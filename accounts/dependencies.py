@@ -1,4 +1,5 @@
-from typing import Annotated
+import time
+from typing import Annotated, NamedTuple
 from uuid import UUID
 
 from fastapi import Depends, HTTPException
@@ -6,35 +7,101 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from accounts import get_user_by_uuid
-from db import get_async_session
-from db.models import User
+import config
+from accounts.db import get_user_by_uuid, get_user_claims
+from db import get_async_session, new_session
+from db.models import User, UserRole
 from utils import decode_jwt
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/accounts/login')
 
 
-def get_current_user_uuid(token: Annotated[str, Depends(oauth2_scheme)]) -> UUID | None:
-    payload = decode_jwt(token, ['user_uuid'])
+class AuthContext(NamedTuple):
+    """Claims of access token, see accounts.utils.encode_access_token. Token is rejected once claims differ from current
+    values of user (password change increments token_version), which are cached for AUTH_CLAIMS_CACHE_TTL seconds"""
+    user_uuid: UUID
+    role: UserRole
+    token_version: int
+    warehouse_uuid: UUID | None
+    delivery_car_uuid: UUID | None
+
+
+# user uuid -> (monotonic time it expires at, current claims or None if user does not exist)
+_claims_cache: dict[UUID, tuple[float, tuple | None]] = {}
+_CLAIMS_CACHE_PRUNE_SIZE = 10_000
+
+
+def _optional_uuid(value: str | None) -> UUID | None:
+    return None if value is None else UUID(value)
+
+
+async def _current_claims(user_uuid: UUID) -> tuple | None:
+    now = time.monotonic()
+    cached = _claims_cache.get(user_uuid)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    async with new_session() as session:
+        claims = await get_user_claims(session, user_uuid)
+    if len(_claims_cache) >= _CLAIMS_CACHE_PRUNE_SIZE:
+        for key in [key for key, (expires_at, _) in _claims_cache.items() if expires_at <= now]:
+            del _claims_cache[key]
+    _claims_cache[user_uuid] = (now + config.AUTH_CLAIMS_CACHE_TTL, claims)
+    return claims
+
+
+# all dependencies below depend on get_auth_context, and fastapi caches dependency results within a request, so token
+# is decoded and checked once per request whatever dependencies handler uses. They are async to not be run in
+# threadpool. Session for the check is opened only on cache miss and closed right away, so streams do not hold it
+async def get_auth_context(token: Annotated[str, Depends(oauth2_scheme)]) -> AuthContext | None:
+    payload = decode_jwt(token, ['user_uuid', 'role', 'token_version'])
     if payload is None:
         return
-    return UUID(payload['user_uuid'])
+    try:
+        context = AuthContext(
+            user_uuid=UUID(payload['user_uuid']),
+            role=UserRole(payload['role']),
+            token_version=payload['token_version'],
+            warehouse_uuid=_optional_uuid(payload.get('warehouse_uuid')),
+            delivery_car_uuid=_optional_uuid(payload.get('delivery_car_uuid'))
+        )
+    except (ValueError, TypeError, AttributeError):  # e.g. role that does not exist anymore
+        return
+    if await _current_claims(context.user_uuid) != (
+            context.token_version, context.role, context.warehouse_uuid, context.delivery_car_uuid
+    ):
+        return
+    return context
 
 
-def get_current_user_uuid_or_401(uuid: Annotated[UUID, Depends(get_current_user_uuid)]) -> UUID:
-    if uuid is None:
+async def get_auth_context_or_401(context: Annotated[AuthContext | None, Depends(get_auth_context)]) -> AuthContext:
+    if context is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Unauthorized')
-    return uuid
+    return context
+
+
+async def get_current_user_uuid(context: Annotated[AuthContext | None, Depends(get_auth_context)]) -> UUID | None:
+    if context is None:
+        return
+    return context.user_uuid
+
+
+async def get_current_user_uuid_or_401(context: Annotated[AuthContext, Depends(get_auth_context_or_401)]) -> UUID:
+    return context.user_uuid
 
 
 async def get_current_user(
-        uuid: Annotated[UUID, Depends(get_current_user_uuid)],
+        context: Annotated[AuthContext | None, Depends(get_auth_context)],
         db_session: Annotated[AsyncSession, Depends(get_async_session)]
 ) -> User | None:
-    if uuid is None:
+    """Unlike claims, user is fetched from database, so token is rejected here as soon as token_version of user is
+    changed (e.g. password is changed), without waiting for claims cache to expire"""
+    if context is None:
+        return
+    user = await get_user_by_uuid(db_session, context.user_uuid)
+    if user is None or user.token_version != context.token_version:
         return
-    return await get_user_by_uuid(db_session, uuid)
+    return user
 
 
 async def get_current_user_or_401(
@@ -43,3 +110,14 @@ async def get_current_user_or_401(
     if current_user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Unauthorized')
     return current_user
+
+
+def require_role(*roles: UserRole):
+    """Authorizes by role claim of token, without fetching user"""
+    async def get_auth_context_with_role(
+            context: Annotated[AuthContext, Depends(get_auth_context_or_401)]
+    ) -> AuthContext:
+        if context.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Forbidden')
+        return context
+    return get_auth_context_with_role
@@ -1,12 +1,27 @@
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from db.models import UserRole
 
 
 class UserDTO(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     uuid: UUID
     full_name: str
-    email: str
+    email: str | None  # None until email is confirmed
     role: UserRole
+
+
+class TokenDTO(BaseModel):
+    token_type: str
+    access_token: str
+
+
+class EmailTaskDTO(BaseModel):
+    email_task_id: str
+
+
+class EmailStatusDTO(BaseModel):
+    status: str
@@ -1,4 +1,5 @@
 import asyncio
+import datetime
 import hashlib
 import base64
 import random
@@ -9,6 +10,7 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
+import config
 from accounts.db import get_user_by_email, user_with_email_exists
 from db.models import User
 from utils import encode_jwt
@@ -54,8 +56,20 @@ async def pre_send_confirm_email_check(db_session: AsyncSession, confirm_email_u
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='User with such email already exists')
 
 
-def send_confirm_email(confirm_email_url: str, user_uuid: UUID, email: str):
+def encode_access_token(user: User) -> str:
+    """Token carries claims used by accounts.dependencies.AuthContext, so most requests are authorized without
+    fetching user"""
+    claims = {'user_uuid': user.uuid.hex, 'role': user.role.value, 'token_version': user.token_version}
+    if user.warehouse_uuid is not None:
+        claims['warehouse_uuid'] = user.warehouse_uuid.hex
+    if user.delivery_car_uuid is not None:
+        claims['delivery_car_uuid'] = user.delivery_car_uuid.hex
+    return encode_jwt(claims, datetime.timedelta(days=config.ACCESS_TOKEN_TTL))
+
+
+def send_confirm_email(confirm_email_url: str, user_uuid: UUID, email: str) -> str:
+    """Returns id of the task that sends email"""
     token = encode_jwt({'user_uuid': user_uuid.hex, 'email': email}, 60 * 60 * 2)
     url = confirm_email_url.replace('$TOKEN$', token)
-    send_email.delay(email, f'someone asked for confirming email in internetshop. If it weren\'t'
-                            f'you, ignore this message. To confirm, follow this link: {url}')
+    return send_email.delay(email, f'someone asked for confirming email in internetshop. If it weren\'t'
+                                   f'you, ignore this message. To confirm, follow this link: {url}').id
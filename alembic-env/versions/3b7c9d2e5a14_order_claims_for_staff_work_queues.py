@@ -0,0 +1,34 @@
+"""Order.claimed_by_uuid and Order.claimed_until fields and orders (warehouse_uuid, status) index for staff work queues
+
+Revision ID: 3b7c9d2e5a14
+Revises: 6f8e11ba400e
+Create Date: 2026-10-19 12:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c9d2e5a14'
+down_revision: Union[str, None] = '6f8e11ba400e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('orders', sa.Column('claimed_by_uuid', sa.Uuid(), nullable=True))
+    op.add_column('orders', sa.Column('claimed_until', sa.DateTime(), nullable=True))
+    op.create_foreign_key(
+        'orders_claimed_by_uuid_fkey', 'orders', 'users', ['claimed_by_uuid'], ['uuid'], ondelete='SET NULL'
+    )
+    op.create_index('orders_warehouse_uuid_status_idx', 'orders', ['warehouse_uuid', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('orders_warehouse_uuid_status_idx', table_name='orders')
+    op.drop_constraint('orders_claimed_by_uuid_fkey', 'orders', type_='foreignkey')
+    op.drop_column('orders', 'claimed_until')
+    op.drop_column('orders', 'claimed_by_uuid')
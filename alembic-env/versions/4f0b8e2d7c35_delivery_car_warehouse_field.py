@@ -0,0 +1,33 @@
+"""DeliveryCar.warehouse_uuid field
+
+Revision ID: 4f0b8e2d7c35
+Revises: e7d3a9c1b6f2
+Create Date: 2026-10-19 15:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f0b8e2d7c35'
+down_revision: Union[str, None] = 'e7d3a9c1b6f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('delivery_cars', sa.Column('warehouse_uuid', sa.Uuid(), nullable=True))
+    op.create_foreign_key(
+        'delivery_cars_warehouse_uuid_fkey', 'delivery_cars', 'warehouses', ['warehouse_uuid'], ['uuid'],
+        ondelete='SET NULL'
+    )
+    op.create_index(op.f('ix_delivery_cars_warehouse_uuid'), 'delivery_cars', ['warehouse_uuid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_delivery_cars_warehouse_uuid'), table_name='delivery_cars')
+    op.drop_constraint('delivery_cars_warehouse_uuid_fkey', 'delivery_cars', type_='foreignkey')
+    op.drop_column('delivery_cars', 'warehouse_uuid')
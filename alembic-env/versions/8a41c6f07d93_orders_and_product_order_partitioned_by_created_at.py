@@ -0,0 +1,139 @@
+"""orders and product_order tables partitioned by month of order creation
+
+Revision ID: 8a41c6f07d93
+Revises: 3b7c9d2e5a14
+Create Date: 2026-10-19 13:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a41c6f07d93'
+down_revision: Union[str, None] = '3b7c9d2e5a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# partitions for every month from the oldest order to 3 months ahead. Later ones are created by celery task
+# orders.tasks.maintain_order_partitions, names must match orders.partitions.partition_name
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    partition_month date;
+BEGIN
+    FOR partition_month IN
+        SELECT generate_series(
+            date_trunc('month', coalesce((SELECT min(created_at) FROM orders_unpartitioned), now())),
+            date_trunc('month', now()) + interval '3 months',
+            interval '1 month'
+        )::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF orders FOR VALUES FROM (%L) TO (%L)',
+            'orders_y' || to_char(partition_month, 'YYYY') || 'm' || to_char(partition_month, 'MM'),
+            partition_month,
+            partition_month + interval '1 month'
+        );
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF product_order FOR VALUES FROM (%L) TO (%L)',
+            'product_order_y' || to_char(partition_month, 'YYYY') || 'm' || to_char(partition_month, 'MM'),
+            partition_month,
+            partition_month + interval '1 month'
+        );
+    END LOOP;
+END $$
+"""
+
+
+def _rename_old_tables() -> None:
+    op.drop_constraint('product_order_order_uuid_fkey', 'product_order', type_='foreignkey')
+    op.rename_table('orders', 'orders_unpartitioned')
+    op.rename_table('product_order', 'product_order_unpartitioned')
+    op.execute('ALTER TABLE orders_unpartitioned RENAME CONSTRAINT orders_pkey TO orders_unpartitioned_pkey')
+    op.execute('ALTER TABLE product_order_unpartitioned '
+               'RENAME CONSTRAINT product_order_pkey TO product_order_unpartitioned_pkey')
+    op.execute('ALTER INDEX orders_warehouse_uuid_status_idx RENAME TO orders_unpartitioned_warehouse_uuid_status_idx')
+    op.execute('ALTER INDEX idx_orders_deliver_address RENAME TO idx_orders_unpartitioned_deliver_address')
+
+
+def _create_orders_foreign_keys_and_indexes() -> None:
+    op.create_foreign_key(
+        'orders_user_uuid_fkey', 'orders', 'users', ['user_uuid'], ['uuid'], ondelete='RESTRICT'
+    )
+    op.create_foreign_key(
+        'orders_warehouse_uuid_fkey', 'orders', 'warehouses', ['warehouse_uuid'], ['uuid'], ondelete='RESTRICT'
+    )
+    op.create_foreign_key(
+        'orders_delivery_car_uuid_fkey', 'orders', 'delivery_cars', ['delivery_car_uuid'], ['uuid'],
+        ondelete='RESTRICT'
+    )
+    op.create_foreign_key(
+        'orders_claimed_by_uuid_fkey', 'orders', 'users', ['claimed_by_uuid'], ['uuid'], ondelete='SET NULL'
+    )
+    op.create_index('orders_warehouse_uuid_status_idx', 'orders', ['warehouse_uuid', 'status'], unique=False)
+    op.create_index('idx_orders_deliver_address', 'orders', ['deliver_address'], unique=False, postgresql_using='gist')
+
+
+def upgrade() -> None:
+    _rename_old_tables()
+
+    op.execute('CREATE TABLE orders (LIKE orders_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+               'PARTITION BY RANGE (created_at)')
+    op.create_primary_key('orders_pkey', 'orders', ['uuid', 'created_at'])
+    _create_orders_foreign_keys_and_indexes()
+
+    op.execute("""
+        CREATE TABLE product_order (
+            product_uuid uuid NOT NULL,
+            order_uuid uuid NOT NULL,
+            order_created_at timestamp without time zone NOT NULL,
+            amount integer NOT NULL,
+            CONSTRAINT check_product_order_amount_positive CHECK (amount >= 0)
+        ) PARTITION BY RANGE (order_created_at)
+    """)
+    op.create_primary_key('product_order_pkey', 'product_order', ['product_uuid', 'order_uuid', 'order_created_at'])
+    op.create_foreign_key(
+        'product_order_product_uuid_fkey', 'product_order', 'products', ['product_uuid'], ['uuid'],
+        ondelete='RESTRICT'
+    )
+    op.create_foreign_key(
+        'product_order_order_uuid_fkey', 'product_order', 'orders',
+        ['order_uuid', 'order_created_at'], ['uuid', 'created_at'], ondelete='CASCADE'
+    )
+
+    op.execute(CREATE_PARTITIONS)
+    op.execute('INSERT INTO orders SELECT * FROM orders_unpartitioned')
+    op.execute('INSERT INTO product_order (product_uuid, order_uuid, order_created_at, amount) '
+               'SELECT product_order_unpartitioned.product_uuid, product_order_unpartitioned.order_uuid, '
+               'orders_unpartitioned.created_at, product_order_unpartitioned.amount '
+               'FROM product_order_unpartitioned '
+               'JOIN orders_unpartitioned ON orders_unpartitioned.uuid = product_order_unpartitioned.order_uuid')
+    op.drop_table('product_order_unpartitioned')
+    op.drop_table('orders_unpartitioned')
+
+
+def downgrade() -> None:
+    # archived partitions (see orders.partitions.archive_month) are not restored
+    _rename_old_tables()
+
+    op.execute('CREATE TABLE orders (LIKE orders_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    op.create_primary_key('orders_pkey', 'orders', ['uuid'])
+    _create_orders_foreign_keys_and_indexes()
+    op.create_table('product_order',
+    sa.Column('product_uuid', sa.Uuid(), nullable=False),
+    sa.Column('order_uuid', sa.Uuid(), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.CheckConstraint('amount >= 0', name='check_product_order_amount_positive'),
+    sa.ForeignKeyConstraint(['order_uuid'], ['orders.uuid'], name='product_order_order_uuid_fkey', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_uuid'], ['products.uuid'], name='product_order_product_uuid_fkey', ondelete='RESTRICT'),
+    sa.PrimaryKeyConstraint('product_uuid', 'order_uuid')
+    )
+
+    op.execute('INSERT INTO orders SELECT * FROM orders_unpartitioned')
+    op.execute('INSERT INTO product_order (product_uuid, order_uuid, amount) '
+               'SELECT product_uuid, order_uuid, amount FROM product_order_unpartitioned')
+    op.drop_table('product_order_unpartitioned')
+    op.drop_table('orders_unpartitioned')
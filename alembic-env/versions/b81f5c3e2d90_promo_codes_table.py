@@ -0,0 +1,36 @@
+"""PromoCode model created
+
+Revision ID: b81f5c3e2d90
+Revises: 9d2c4b7a1e58
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f5c3e2d90'
+down_revision: Union[str, None] = '9d2c4b7a1e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('promo_codes',
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('percent', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Integer(), nullable=True),
+    sa.Column('min_total', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('valid_until', sa.DateTime(), nullable=True),
+    sa.CheckConstraint('(percent IS NULL) != (amount IS NULL)', name='check_promo_code_percent_or_amount'),
+    sa.CheckConstraint('amount > 0', name='check_promo_code_amount_positive'),
+    sa.CheckConstraint('percent > 0 AND percent <= 100', name='check_promo_code_percent'),
+    sa.PrimaryKeyConstraint('code')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('promo_codes')
@@ -0,0 +1,30 @@
+"""product_user (user_uuid) and product_order (order_uuid, order_created_at) indexes
+
+Revision ID: e7d3a9c1b6f2
+Revises: c52e1f8b94d7
+Create Date: 2026-10-19 14:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7d3a9c1b6f2'
+down_revision: Union[str, None] = 'c52e1f8b94d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('product_user_user_uuid_idx', 'product_user', ['user_uuid'], unique=False)
+    op.create_index(
+        'product_order_order_uuid_idx', 'product_order', ['order_uuid', 'order_created_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('product_order_order_uuid_idx', table_name='product_order')
+    op.drop_index('product_user_user_uuid_idx', table_name='product_user')
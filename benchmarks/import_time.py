@@ -0,0 +1,59 @@
+"""Reports import cost of project modules.
+
+Usage: python benchmarks/import_time.py [module ...]  (default: main)
+Runs `python -X importtime` in a fresh interpreter, so results are not affected by already imported modules.
+"""
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def project_packages() -> set[str]:
+    """Top-level modules and packages of the project"""
+    names = set()
+    for entry in os.listdir(PROJECT_ROOT):
+        path = os.path.join(PROJECT_ROOT, entry)
+        if entry.endswith('.py'):
+            names.add(entry.removesuffix('.py'))
+        elif os.path.isfile(os.path.join(path, '__init__.py')):
+            names.add(entry)
+    return names
+
+
+def measure(module: str) -> list[tuple[str, int, int]]:
+    env = os.environ.copy()
+    env.setdefault('SECRET_KEY', 'benchmark')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'importing {module} failed:\n{proc.stderr}')
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix('import time:').split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main(modules: list[str]) -> None:
+    packages = project_packages()
+    for module in modules:
+        rows = measure(module)
+        total = max(cumulative for _, _, cumulative in rows)
+        print(f'{module}: {total / 1000:.1f} ms total')
+        project_rows = [row for row in rows if row[0].split('.')[0] in packages]
+        for name, self_us, cumulative_us in sorted(project_rows, key=lambda row: row[2], reverse=True):
+            print(f'  {name:<30} self {self_us / 1000:8.1f} ms   cumulative {cumulative_us / 1000:8.1f} ms')
+        heaviest = sorted(rows, key=lambda row: row[1], reverse=True)[:10]
+        print('  heaviest modules by self time:')
+        for name, self_us, _ in heaviest:
+            print(f'    {name:<40} {self_us / 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or ['main'])
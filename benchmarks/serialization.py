@@ -0,0 +1,145 @@
+"""Measures cost of response serialization per route.
+
+Usage: python benchmarks/serialization.py [--requests N] [--path PREFIX]
+Every route of project routers that has a sample below is mounted into a separate app with the same response_model, its
+endpoint returns the sample without touching database. The app is called directly through ASGI, so the only work
+besides routing is validation of the returned value and encoding it to JSON. Variants:
+  jsonable_encoder  - no response_model, result goes through jsonable_encoder and json.dumps
+  response_model    - response_model of the route with default response class
+  orjson            - response_model of the route with ORJSONResponse
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+import uuid
+import warnings
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+import accounts  # noqa: E402
+import cart  # noqa: E402
+import delivery  # noqa: E402
+import orders  # noqa: E402
+import recommendations  # noqa: E402
+import staff  # noqa: E402
+from accounts.models import TokenDTO, EmailTaskDTO  # noqa: E402
+from db.models import User, UserRole, Product, OrderStatus  # noqa: E402
+from delivery.models import CoverageDTO  # noqa: E402
+from orders.models import OrderStatusDTO  # noqa: E402
+from pricing.models import PriceDTO  # noqa: E402
+from staff.models import ClaimedOrderDTO  # noqa: E402
+
+warnings.filterwarnings('ignore', 'ORJSONResponse is deprecated')
+from fastapi.responses import ORJSONResponse  # noqa: E402
+
+ROUTERS = [accounts.router, cart.router, orders.router, staff.router, recommendations.router, delivery.router]
+
+
+def product(index: int) -> Product:
+    return Product(uuid=uuid.uuid4(), price=1000 + index, title=f'product {index}', description='description ' * 40,
+                   characteristics={'weight': index, 'color': 'black', 'sizes': [1, 2, 3]}, discount=index % 30,
+                   type_uuid=uuid.uuid4())
+
+
+def claimed_order() -> ClaimedOrderDTO:
+    now = datetime.datetime.now()
+    return ClaimedOrderDTO(uuid=uuid.uuid4(), created_at=now, claimed_until=now + datetime.timedelta(minutes=5))
+
+
+SAMPLES = {
+    ('POST', '/accounts/login'): lambda: TokenDTO(token_type='bearer', access_token='x' * 200),
+    ('POST', '/accounts/signup'): lambda: EmailTaskDTO(email_task_id=str(uuid.uuid4())),
+    ('GET', '/accounts/profile'): lambda: User(uuid=uuid.uuid4(), full_name='Full Name', email='user@example.com',
+                                               role=UserRole.customer),
+    ('GET', '/cart/'): lambda: [(product(i), i + 1) for i in range(50)],
+    ('GET', '/cart/price'): lambda: PriceDTO(subtotal=100000, products_total=90000, total=85000, discount=15000),
+    ('GET', '/orders/{order_uuid}/status'): lambda: OrderStatusDTO(uuid=uuid.uuid4(), status=OrderStatus.collecting),
+    ('POST', '/staff/warehouse/claim'): lambda: [claimed_order() for _ in range(50)],
+    ('GET', '/recommendations/products/{product_uuid}'): lambda: [uuid.uuid4() for _ in range(10)],
+    ('GET', '/delivery/coverage'): lambda: CoverageDTO(covered=True, warehouse_uuid=uuid.uuid4(), eta_minutes=42.5),
+}
+
+
+def returning(sample):
+    # sample is not a default argument of endpoint, otherwise fastapi treats it as a parameter and copies it
+    async def endpoint():
+        return sample
+    return endpoint
+
+
+def build_app(routes: list[APIRoute], variant: str) -> FastAPI:
+    app = FastAPI(openapi_url=None)
+    for index, route in enumerate(routes):
+        kwargs = {}
+        if variant != 'jsonable_encoder':
+            kwargs['response_model'] = route.response_model
+        if variant == 'orjson':
+            kwargs['response_class'] = ORJSONResponse
+        app.add_api_route(f'/{index}', returning(SAMPLES[(next(iter(route.methods)), route.path)]()), methods=['GET'],
+                          **kwargs)
+    return app
+
+
+async def call(app: FastAPI, path: str) -> int:
+    status = 0
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+             'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'', 'headers': [],
+             'server': ('benchmark', 80), 'client': ('benchmark', 1)}
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app: FastAPI, path: str, requests: int) -> float | None:
+    """Returns microseconds per request, None if the route fails to serialize"""
+    try:
+        if await call(app, path) != 200:
+            return
+    except Exception:
+        return
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def run(requests: int, prefix: str) -> None:
+    routes = [
+        route for router in ROUTERS for route in router.routes
+        if isinstance(route, APIRoute) and route.path.startswith(prefix)
+        and (next(iter(route.methods)), route.path) in SAMPLES
+    ]
+    variants = ['jsonable_encoder', 'response_model', 'orjson']
+    apps = {variant: build_app(routes, variant) for variant in variants}
+    print(f'{"route":<50}' + ''.join(f'{variant:>18}' for variant in variants) + '   (us per request)')
+    for index, route in enumerate(routes):
+        results = [await measure(apps[variant], f'/{index}', requests) for variant in variants]
+        print(f'{next(iter(route.methods)) + " " + route.path:<50}'
+              + ''.join(f'{"fails":>18}' if result is None else f'{result:>18.1f}' for result in results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--path', default='/', help='measure only routes with this prefix')
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Compares api throughput across server configurations.
+
+Usage: python benchmarks/serve_throughput.py [--duration SECONDS] [--concurrency N] [--path PATH]
+Every configuration is started with serve.py in a subprocess and loaded with concurrent keep-alive requests.
+Default path (/openapi.json) does not need database, so the benchmark measures server overhead only. Postgres is
+optional: without it api still starts (order events listener and delivery coverage log errors and retry in background),
+DB_HOST and DB_PORT default to local postgres if they are not set.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGURATIONS = {
+    '1 worker, asyncio + h11': ['--workers', '1', '--loop', 'asyncio', '--http', 'h11'],
+    '1 worker, uvloop + httptools': ['--workers', '1', '--loop', 'uvloop', '--http', 'httptools'],
+    'cpu workers, asyncio + h11': ['--loop', 'asyncio', '--http', 'h11'],
+    'cpu workers, uvloop + httptools': ['--loop', 'uvloop', '--http', 'httptools'],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f'server at {url} did not start')
+
+
+async def load(url: str, duration: float, concurrency: int) -> tuple[int, int]:
+    done = errors = 0
+    deadline = time.monotonic() + duration
+
+    async def user(client: httpx.AsyncClient):
+        nonlocal done, errors
+        while time.monotonic() < deadline:
+            response = await client.get(url)
+            if response.status_code == 200:
+                done += 1
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+    return done, errors
+
+
+def run_configuration(name: str, serve_args: list[str], args: argparse.Namespace) -> None:
+    port = free_port()
+    env = os.environ.copy()
+    env.setdefault('SECRET_KEY', 'benchmark')
+    env.setdefault('DB_HOST', '127.0.0.1')
+    env.setdefault('DB_PORT', '5432')
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--port', str(port), *serve_args],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{port}{args.path}'
+    try:
+        asyncio.run(wait_until_ready(url))
+        done, errors = asyncio.run(load(url, args.duration, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+    print(f'{name:<35} {done / args.duration:10.1f} req/s   errors: {errors}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--path', default='/openapi.json')
+    args = parser.parse_args()
+    for name, serve_args in CONFIGURATIONS.items():
+        run_configuration(name, serve_args, args)
+
+
+if __name__ == '__main__':
+    main()
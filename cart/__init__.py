@@ -1,19 +1,24 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Query, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
 import cart.db
 from accounts import get_current_user_uuid_or_401
 from cart.db import get_user_products, change_amount
+from cart.models import ProductDTO
 from db import get_async_session
 from db.models import Product
+from pricing import price_lines
+from pricing.db import get_cart_lines, get_promo_code_rules
+from pricing.models import PriceDTO
 
 router = APIRouter(prefix='/cart')
 
 
-@router.get('/')
+@router.get('/', response_model=list[tuple[ProductDTO, int]])
 async def get_all_products(
         user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)],
         db_session: Annotated[AsyncSession, Depends(get_async_session)]
@@ -21,7 +26,21 @@ async def get_all_products(
     return await get_user_products(db_session, user_uuid)
 
 
-@router.post('/add_product')
+@router.get('/price', response_model=PriceDTO)
+async def get_cart_price(
+        user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)],
+        db_session: Annotated[AsyncSession, Depends(get_async_session)],
+        promo_code: Annotated[str | None, Query()] = None
+):
+    rules = await get_promo_code_rules(db_session, promo_code)
+    if rules is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid promo code')
+    price = price_lines(await get_cart_lines(db_session, user_uuid), rules)
+    return PriceDTO(subtotal=price.subtotal, products_total=price.products_total, total=price.total,
+                    discount=price.discount)
+
+
+@router.post('/add_product', response_model=None)
 async def add_product_to_cart(
         user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)],
         product_uuid: Annotated[UUID, Body()],
@@ -31,7 +50,7 @@ async def add_product_to_cart(
     await cart.db.add_product_to_cart(db_session, product_uuid, user_uuid, amount)
 
 
-@router.post('/remove_product')
+@router.post('/remove_product', response_model=None)
 async def remove_product_from_cart(
         user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)],
         product_uuid: Annotated[UUID, Body(embed=True)],
@@ -40,7 +59,7 @@ async def remove_product_from_cart(
     await cart.db.remove_product_from_cart(db_session, product_uuid, user_uuid)
 
 
-@router.post('/change_amount')
+@router.post('/change_amount', response_model=None)
 async def change_products_amount_in_cart(
         user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)],
         product_uuid: Annotated[UUID, Body()],
@@ -38,3 +38,9 @@ async def change_amount(session: AsyncSession, product_uuid: UUID, user_uuid: UU
         .values({'amount': new_amount})
     await session.execute(statement)
     await session.commit()
+
+
+async def get_user_product_uuids(session: AsyncSession, user_uuid: UUID) -> list[UUID]:
+    res = await session.execute(select(product_user_association_table.c.product_uuid)
+                                .where(product_user_association_table.c.user_uuid == user_uuid))
+    return list(res.scalars())
@@ -0,0 +1,15 @@
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ProductDTO(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    uuid: UUID
+    price: int
+    title: str
+    description: str
+    characteristics: dict | None
+    discount: int
+    type_uuid: UUID
@@ -1,14 +1,50 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 
 import config
 
 SQLALCHEMY_DB_URL = f"postgresql+asyncpg://{config.DB_USERNAME}:{config.DB_PASSWORD}@{config.DB_HOST}:{config.DB_PORT}/internetshop"
 
-engine = create_async_engine(SQLALCHEMY_DB_URL)
+# engine is created lazily (on app startup or on first session request), so importing db has no side effects
+engine: AsyncEngine | None = None
 
-async_session = async_sessionmaker(bind=engine, expire_on_commit=False)
+async_session: async_sessionmaker[AsyncSession] | None = None
+
+
+def init_engine() -> AsyncEngine:
+    global engine, async_session
+    if engine is None:
+        # pre ping replaces connections broken by database restart instead of failing requests that get them
+        engine = create_async_engine(SQLALCHEMY_DB_URL, pool_pre_ping=True)
+        async_session = async_sessionmaker(bind=engine, expire_on_commit=False)
+    return engine
+
+
+async def dispose_engine() -> None:
+    global engine, async_session
+    if engine is not None:
+        await engine.dispose()
+    engine = None
+    async_session = None
+
+
+def reset_engine_after_fork() -> None:
+    # connections of pool inherited from parent process must not be used (nor closed) by child, so the pool is dropped
+    # without closing them and a new engine is created in the child on first use
+    global engine, async_session
+    if engine is not None:
+        engine.sync_engine.dispose(close=False)
+    engine = None
+    async_session = None
+
+
+def new_session() -> AsyncSession:
+    """Session for code that is not a request dependency (streams, background tasks). Import it by name: in packages
+    that have their own db submodule, name db refers to that submodule"""
+    if async_session is None:
+        init_engine()
+    return async_session()
 
 
 async def get_async_session():
-    async with async_session() as session:
+    async with new_session() as session:
         yield session
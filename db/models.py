@@ -29,6 +29,8 @@ class User(Base):
     email: Mapped[str | None] = mapped_column(String(320), unique=True)  # 320 is standardised max email length
     password_hash: Mapped[str]
     role: Mapped[UserRole] = mapped_column(sqlalchemy.Enum(UserRole), server_default=text("'customer'"))
+    # incremented when password is changed, access tokens with older version are rejected where user is fetched
+    token_version: Mapped[int] = mapped_column(server_default=text('0'))
     warehouse_uuid: Mapped[UUID | None] = mapped_column(
         ForeignKey('warehouses.uuid', name='users_warehouse_uuid_fkey', ondelete='RESTRICT'),
         sqlalchemy.CheckConstraint(
@@ -55,10 +57,14 @@ product_user_association_table = Table(
         'users.uuid', ondelete='CASCADE', name='product_user_user_uuid_fkey'
     ), primary_key=True),
     Column('amount', Integer, nullable=False),
-    sqlalchemy.CheckConstraint('amount >= 0', name='check_product_user_amount_positive')
+    sqlalchemy.CheckConstraint('amount >= 0', name='check_product_user_amount_positive'),
+    # primary key starts with product_uuid, so it can't be used to find cart of user
+    sqlalchemy.Index('product_user_user_uuid_idx', 'user_uuid')
 )
 
 
+# partitioned by order creation time together with orders (see Order), so that rows of old orders are archived with
+# them. order_created_at is a part of foreign key, because primary key of partitioned table must contain partition key
 product_order_association_table = Table(
     'product_order',
     Base.metadata,
@@ -66,12 +72,17 @@ product_order_association_table = Table(
         'products.uuid',
         ondelete='RESTRICT',
         name='product_order_product_uuid_fkey'), primary_key=True),
-    Column('order_uuid', ForeignKey(
-        'orders.uuid',
-        ondelete='CASCADE',
-        name='product_order_order_uuid_fkey'), primary_key=True),
+    Column('order_uuid', primary_key=True),
+    Column('order_created_at', sqlalchemy.DateTime(), primary_key=True),
     Column('amount', Integer(), nullable=False),
-    sqlalchemy.CheckConstraint('amount >= 0', name='check_product_order_amount_positive')
+    sqlalchemy.ForeignKeyConstraint(
+        ['order_uuid', 'order_created_at'], ['orders.uuid', 'orders.created_at'],
+        ondelete='CASCADE', name='product_order_order_uuid_fkey'
+    ),
+    sqlalchemy.CheckConstraint('amount >= 0', name='check_product_order_amount_positive'),
+    # for finding products of order (and for cascade delete of orders)
+    sqlalchemy.Index('product_order_order_uuid_idx', 'order_uuid', 'order_created_at'),
+    postgresql_partition_by='RANGE (order_created_at)'
 )
 
 
@@ -135,6 +146,25 @@ class Product(Base):
     search_vector: Mapped[str | None] = mapped_column(TSVECTOR)
 
 
+class PromoCode(Base):
+    """Cart discount applied after product discounts (see pricing.db.get_promo_code_rules). Exactly one of percent and
+    amount is set"""
+    __tablename__ = 'promo_codes'
+    __table_args__ = (
+        sqlalchemy.CheckConstraint('(percent IS NULL) != (amount IS NULL)', name='check_promo_code_percent_or_amount'),
+    )
+
+    code: Mapped[str] = mapped_column(String(length=50), primary_key=True)
+    percent: Mapped[int | None] = mapped_column(
+        Integer, sqlalchemy.CheckConstraint('percent > 0 AND percent <= 100', name='check_promo_code_percent')
+    )
+    amount: Mapped[int | None] = mapped_column(
+        Integer, sqlalchemy.CheckConstraint('amount > 0', name='check_promo_code_amount_positive')
+    )
+    min_total: Mapped[int] = mapped_column(server_default=text('0'))
+    valid_until: Mapped[datetime.datetime | None]
+
+
 class Review(Base):
     __tablename__ = 'reviews'
     # this unique constraint prevents user to have more than one review on the same product
@@ -177,6 +207,14 @@ class OrderStatus(enum.Enum):
 
 class Order(Base):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # staff work queues look for orders by warehouse and status (see staff/db.py)
+        sqlalchemy.Index('orders_warehouse_uuid_status_idx', 'warehouse_uuid', 'status'),
+        # orders are partitioned by month; partitions are created and archived by celery task (see orders/tasks.py).
+        # Queries by uuid or status have no created_at predicate, so they check every attached partition, the point of
+        # archiving is to keep the number of attached partitions small
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
 
     uuid: Mapped[UUID] = mapped_column(primary_key=True, server_default=text('gen_random_uuid()'))
     user_uuid: Mapped[UUID] = mapped_column(
@@ -186,7 +224,7 @@ class Order(Base):
     # after order is created, price of products might change, but it should not affect price of order. That is why we
     # can't calculate its price based on price of products that is currently in db.
     price: Mapped[int]
-    created_at: Mapped[datetime.datetime] = mapped_column(server_default=text('NOW()'))
+    created_at: Mapped[datetime.datetime] = mapped_column(primary_key=True, server_default=text('NOW()'))
     deliver_address: Mapped[Geometry] = mapped_column(Geometry(geometry_type='POINT', srid=4326))
     charge_id: Mapped[str] = mapped_column(String(length=100))
     warehouse_uuid: Mapped[UUID] = mapped_column(
@@ -195,6 +233,12 @@ class Order(Base):
     delivery_car_uuid: Mapped[UUID | None] = mapped_column(
         ForeignKey('delivery_cars.uuid', name='orders_delivery_car_uuid_fkey', ondelete='RESTRICT')
     )
+    # staff member who is working on order now. Claim expires at claimed_until, so order that was claimed by worker
+    # who went away returns to queue
+    claimed_by_uuid: Mapped[UUID | None] = mapped_column(
+        ForeignKey('users.uuid', name='orders_claimed_by_uuid_fkey', ondelete='SET NULL')
+    )
+    claimed_until: Mapped[datetime.datetime | None]
 
 
 class Warehouse(Base):
@@ -208,3 +252,19 @@ class DeliveryCar(Base):
     __tablename__ = 'delivery_cars'
 
     uuid: Mapped[UUID] = mapped_column(primary_key=True, server_default=text('gen_random_uuid()'))
+    # warehouse the car delivers from; number of cars affects delivery estimate of warehouse (see delivery.coverage)
+    warehouse_uuid: Mapped[UUID | None] = mapped_column(
+        ForeignKey('warehouses.uuid', name='delivery_cars_warehouse_uuid_fkey', ondelete='SET NULL'), index=True
+    )
+
+
+class IdempotencyKey(Base):
+    """Saved responses to requests with Idempotency-Key header (see idempotency.IdempotencyMiddleware)"""
+    __tablename__ = 'idempotency_keys'
+
+    key: Mapped[str] = mapped_column(String(length=64), primary_key=True)  # sha256 hex digest
+    request_hash: Mapped[str] = mapped_column(String(length=64))
+    status_code: Mapped[int | None]
+    headers: Mapped[list | None] = mapped_column(JSON)
+    body: Mapped[bytes | None] = mapped_column(sqlalchemy.LargeBinary)
+    expires_at: Mapped[datetime.datetime] = mapped_column(index=True)
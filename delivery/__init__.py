@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Query, HTTPException
+from starlette import status
+
+import config
+from db import new_session
+from delivery.coverage import CoverageIndex
+from delivery.db import get_warehouses_state
+from delivery.models import CoverageDTO
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix='/delivery')
+
+_index: CoverageIndex | None = None
+# published after the first successful sync, until then coverage is unavailable
+coverage: CoverageIndex | None = None
+
+
+def _synced(index: CoverageIndex, warehouses: dict) -> tuple[CoverageIndex, int]:
+    index = index.copy()
+    return index, index.sync(warehouses)
+
+
+async def sync_coverage() -> None:
+    global _index, coverage
+    async with new_session() as session:
+        warehouses = await get_warehouses_state(session)
+    if _index.warehouses != warehouses:
+        # rebuilding cells takes milliseconds per changed warehouse, so it is done in a thread on a copy, and requests
+        # use current index until the copy is swapped in
+        _index, changed = await asyncio.to_thread(_synced, _index, warehouses)
+        logger.info('delivery coverage updated, %d warehouses changed', changed)
+    coverage = _index
+
+
+async def _refresh_coverage_forever() -> None:
+    while True:
+        await asyncio.sleep(config.DELIVERY_COVERAGE_REFRESH)
+        try:
+            await sync_coverage()
+        except Exception:
+            logger.exception('failed to refresh delivery coverage')
+
+
+async def start_coverage() -> asyncio.Task:
+    """Builds coverage index and starts task that keeps it up to date. If database is not available, route answers 503
+    until the first successful refresh"""
+    global _index
+    _index = CoverageIndex(
+        config.DELIVERY_RADIUS_KM, config.DELIVERY_SPEED_KMH, config.DELIVERY_HANDLING_MINUTES,
+        config.DELIVERY_DISPATCH_MINUTES
+    )
+    try:
+        await sync_coverage()
+    except Exception:
+        logger.exception('failed to build delivery coverage')
+    return asyncio.create_task(_refresh_coverage_forever())
+
+
+@router.get('/coverage', response_model=CoverageDTO)
+async def get_coverage(
+        lon: Annotated[float, Query(ge=-180, le=180)],
+        lat: Annotated[float, Query(ge=-90, le=90)]
+):
+    if coverage is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Coverage is not available')
+    estimate = coverage.estimate(lon, lat)
+    if estimate is None:
+        return CoverageDTO(covered=False)
+    return CoverageDTO(covered=True, warehouse_uuid=estimate.warehouse_uuid, eta_minutes=round(estimate.eta_minutes))
@@ -0,0 +1,108 @@
+import bisect
+import math
+from typing import NamedTuple
+from uuid import UUID
+
+EARTH_RADIUS_KM = 6371.0
+CELL_DEGREES = 0.01  # ~1.1 km along meridian, so coverage border is precise up to ~0.8 km
+
+
+class WarehouseState(NamedTuple):
+    lon: float
+    lat: float
+    cars: int
+
+
+class Estimate(NamedTuple):
+    eta_minutes: float
+    warehouse_uuid: UUID
+
+
+def cell_of(lon: float, lat: float) -> tuple[int, int]:
+    return math.floor(lon / CELL_DEGREES), math.floor(lat / CELL_DEGREES)
+
+
+def distance_km(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class CoverageIndex:
+    """Grid of cells covered by warehouses. Every cell keeps estimates of all warehouses that cover it, sorted by eta,
+    so lookup is a single dict access, and change of one warehouse touches only cells in its radius. Lists of
+    estimates are replaced, never changed in place, so copy() shares them and is cheap"""
+
+    def __init__(self, radius_km: float, speed_kmh: float, handling_minutes: float, dispatch_minutes: float):
+        self.radius_km = radius_km
+        self.speed_kmh = speed_kmh
+        self.handling_minutes = handling_minutes
+        self.dispatch_minutes = dispatch_minutes
+        self.warehouses: dict[UUID, WarehouseState] = {}
+        self._cells: dict[tuple[int, int], list[Estimate]] = {}
+
+    def eta_minutes(self, distance: float, cars: int) -> float:
+        return self.handling_minutes + self.dispatch_minutes / cars + distance / self.speed_kmh * 60
+
+    def _warehouse_cells(self, state: WarehouseState):
+        """Yields (cell, distance to cell center) of cells in radius of warehouse"""
+        lat_cells = math.ceil(self.radius_km / 111.0 / CELL_DEGREES)
+        lon_cells = math.ceil(self.radius_km / (111.0 * max(math.cos(math.radians(state.lat)), 0.01)) / CELL_DEGREES)
+        center_lon, center_lat = cell_of(state.lon, state.lat)
+        for cell_lon in range(center_lon - lon_cells, center_lon + lon_cells + 1):
+            for cell_lat in range(center_lat - lat_cells, center_lat + lat_cells + 1):
+                distance = distance_km(
+                    state.lon, state.lat, (cell_lon + 0.5) * CELL_DEGREES, (cell_lat + 0.5) * CELL_DEGREES
+                )
+                if distance <= self.radius_km:
+                    yield (cell_lon, cell_lat), distance
+
+    def remove_warehouse(self, warehouse_uuid: UUID) -> None:
+        state = self.warehouses.pop(warehouse_uuid, None)
+        if state is None or state.cars == 0:
+            return
+        for cell, _ in self._warehouse_cells(state):
+            estimates = [estimate for estimate in self._cells.get(cell, ()) if estimate.warehouse_uuid != warehouse_uuid]
+            if estimates:
+                self._cells[cell] = estimates
+            else:
+                self._cells.pop(cell, None)
+
+    def set_warehouse(self, warehouse_uuid: UUID, state: WarehouseState) -> None:
+        """Adds warehouse or updates it if its position or number of cars changed. Warehouse without cars covers
+        nothing"""
+        if self.warehouses.get(warehouse_uuid) == state:
+            return
+        self.remove_warehouse(warehouse_uuid)
+        self.warehouses[warehouse_uuid] = state
+        if state.cars == 0:
+            return
+        for cell, distance in self._warehouse_cells(state):
+            estimates = list(self._cells.get(cell, ()))
+            bisect.insort(estimates, Estimate(self.eta_minutes(distance, state.cars), warehouse_uuid))
+            self._cells[cell] = estimates
+
+    def copy(self) -> 'CoverageIndex':
+        index = CoverageIndex(self.radius_km, self.speed_kmh, self.handling_minutes, self.dispatch_minutes)
+        index.warehouses = dict(self.warehouses)
+        index._cells = dict(self._cells)
+        return index
+
+    def sync(self, warehouses: dict[UUID, WarehouseState]) -> int:
+        """Applies current state of all warehouses, returns number of changed warehouses"""
+        changed = 0
+        for warehouse_uuid in self.warehouses.keys() - warehouses.keys():
+            self.remove_warehouse(warehouse_uuid)
+            changed += 1
+        for warehouse_uuid, state in warehouses.items():
+            if self.warehouses.get(warehouse_uuid) != state:
+                self.set_warehouse(warehouse_uuid, state)
+                changed += 1
+        return changed
+
+    def estimate(self, lon: float, lat: float) -> Estimate | None:
+        """Fastest warehouse that delivers to the point, None if point is not covered"""
+        estimates = self._cells.get(cell_of(lon, lat))
+        if not estimates:
+            return
+        return estimates[0]
@@ -0,0 +1,15 @@
+from uuid import UUID
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Warehouse, DeliveryCar
+from delivery.coverage import WarehouseState
+
+
+async def get_warehouses_state(session: AsyncSession) -> dict[UUID, WarehouseState]:
+    statement = select(
+        Warehouse.uuid, func.ST_X(Warehouse.address), func.ST_Y(Warehouse.address), func.count(DeliveryCar.uuid)
+    ).outerjoin(DeliveryCar, DeliveryCar.warehouse_uuid == Warehouse.uuid).group_by(Warehouse.uuid)
+    res = await session.execute(statement)
+    return {row[0]: WarehouseState(row[1], row[2], row[3]) for row in res}
@@ -0,0 +1,9 @@
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class CoverageDTO(BaseModel):
+    covered: bool
+    warehouse_uuid: UUID | None = None
+    eta_minutes: float | None = None
@@ -0,0 +1,183 @@
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import NamedTuple, Protocol
+
+from starlette import status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+import config
+
+MUTATING_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+
+class IdempotencyRecord(NamedTuple):
+    request_hash: str
+    status_code: int | None  # None while request is being handled
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class IdempotencyStore(Protocol):
+    async def get(self, key: str) -> IdempotencyRecord | None:
+        ...
+
+    async def start(self, key: str, request_hash: str) -> bool:
+        """Saves in-progress record that expires after lease (unless it is finished). Returns False if there already
+        is a (not expired) record with such key"""
+
+    async def finish(self, key: str, record: IdempotencyRecord) -> None:
+        ...
+
+    async def discard(self, key: str) -> None:
+        ...
+
+
+class InMemoryIdempotencyStore:
+    """Store of a single process, bounded by number of keys (least recently used are evicted first)"""
+
+    def __init__(self, ttl: int, max_keys: int, lease: int):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.lease = lease
+        self._records: OrderedDict[str, tuple[float, IdempotencyRecord]] = OrderedDict()
+
+    async def get(self, key: str) -> IdempotencyRecord | None:
+        item = self._records.get(key)
+        if item is None:
+            return
+        expires_at, record = item
+        if expires_at < time.monotonic():
+            del self._records[key]
+            return
+        self._records.move_to_end(key)
+        return record
+
+    async def start(self, key: str, request_hash: str) -> bool:
+        if await self.get(key) is not None:
+            return False
+        self._records[key] = (time.monotonic() + self.lease, IdempotencyRecord(request_hash, None, [], b''))
+        while len(self._records) > self.max_keys:
+            self._records.popitem(last=False)
+        return True
+
+    async def finish(self, key: str, record: IdempotencyRecord) -> None:
+        self._records[key] = (time.monotonic() + self.ttl, record)
+
+    async def discard(self, key: str) -> None:
+        self._records.pop(key, None)
+
+
+def create_store() -> IdempotencyStore:
+    if config.IDEMPOTENCY_BACKEND == 'database':
+        from idempotency.db import DatabaseIdempotencyStore
+        return DatabaseIdempotencyStore(config.IDEMPOTENCY_TTL, config.IDEMPOTENCY_LEASE)
+    return InMemoryIdempotencyStore(config.IDEMPOTENCY_TTL, config.IDEMPOTENCY_MAX_KEYS, config.IDEMPOTENCY_LEASE)
+
+
+def _hash(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """Mutating requests with Idempotency-Key header are handled once: response is saved, and retries with the same
+    key get saved response without running handler again. Key is scoped by Authorization header, so keys of different
+    users never collide. Retry with the same key, but different request, gets 422; retry that comes while the first
+    request is still being handled gets 409. Responses with 5xx status are not saved, so such requests can be retried.
+    Requests to exclude_paths are passed through, their responses (e.g. access tokens) must not be stored"""
+
+    def __init__(self, app: ASGIApp, store: IdempotencyStore | None = None, exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.store = store or create_store()
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] not in MUTATING_METHODS or scope['path'] in self.exclude_paths:
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get('idempotency-key')
+        if idempotency_key is None:
+            return await self.app(scope, receive, send)
+
+        body = await _read_body(receive)
+        key = _hash(headers.get('authorization', '').encode(), idempotency_key.encode())
+        request_hash = _hash(scope['method'].encode(), scope['path'].encode(), scope['query_string'], body)
+
+        record = await self.store.get(key)
+        if record is None and not await self.store.start(key, request_hash):
+            record = await self.store.get(key)
+        if record is not None:
+            return await self._replay(record, request_hash, scope, receive, send)
+
+        response_start = {}
+        response_body = []
+
+        async def send_and_capture(message: Message):
+            if message['type'] == 'http.response.start':
+                response_start.update(message)
+            elif message['type'] == 'http.response.body':
+                response_body.append(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_body(body, receive), send_and_capture)
+        except BaseException:
+            await self.store.discard(key)
+            raise
+        status_code = response_start.get('status', status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if status_code >= 500:
+            await self.store.discard(key)
+        else:
+            await self.store.finish(key, IdempotencyRecord(
+                request_hash, status_code, list(response_start.get('headers', [])), b''.join(response_body)
+            ))
+
+    async def _replay(self, record: IdempotencyRecord, request_hash: str, scope: Scope, receive: Receive, send: Send):
+        if record.request_hash != request_hash:
+            response = JSONResponse(
+                {'detail': 'Idempotency-Key was used with different request'},
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT
+            )
+        elif record.status_code is None:
+            response = JSONResponse(
+                {'detail': 'Request with this Idempotency-Key is being handled'},
+                status_code=status.HTTP_409_CONFLICT
+            )
+        else:
+            await send({
+                'type': 'http.response.start',
+                'status': record.status_code,
+                'headers': [*record.headers, (b'idempotent-replayed', b'true')]
+            })
+            await send({'type': 'http.response.body', 'body': record.body})
+            return
+        await response(scope, receive, send)
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        more_body = message.get('more_body', False)
+    return b''.join(chunks)
+
+
+def _replay_body(body: bytes, receive: Receive) -> Receive:
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+    return replay
@@ -0,0 +1,92 @@
+import base64
+import datetime
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import new_session
+from db.models import IdempotencyKey
+from idempotency import IdempotencyRecord
+
+
+def _encode_headers(headers: list[tuple[bytes, bytes]]) -> list[list[str]]:
+    return [[base64.b64encode(name).decode('ascii'), base64.b64encode(value).decode('ascii')] for name, value in headers]
+
+
+def _decode_headers(headers: list[list[str]] | None) -> list[tuple[bytes, bytes]]:
+    return [(base64.b64decode(name), base64.b64decode(value)) for name, value in headers or []]
+
+
+async def get_idempotency_record(session: AsyncSession, key: str) -> IdempotencyRecord | None:
+    res = await session.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.headers, IdempotencyKey.body)
+        .where(IdempotencyKey.key == key, IdempotencyKey.expires_at > func.now())
+    )
+    row = res.first()
+    if row is None:
+        return
+    return IdempotencyRecord(row[0], row[1], _decode_headers(row[2]), row[3] or b'')
+
+
+async def start_idempotency_key(session: AsyncSession, key: str, request_hash: str, lease: datetime.timedelta) -> bool:
+    # expired record with the same key (including in-progress one of request whose worker died) is replaced.
+    # In-progress record expires after lease, finish_idempotency_key extends it to ttl
+    statement = insert(IdempotencyKey).values({
+        'key': key, 'request_hash': request_hash, 'expires_at': func.now() + lease
+    })
+    statement = statement.on_conflict_do_update(
+        index_elements=[IdempotencyKey.key],
+        set_={'request_hash': request_hash, 'status_code': None, 'headers': None, 'body': None,
+              'expires_at': func.now() + lease},
+        where=IdempotencyKey.expires_at <= func.now()
+    ).returning(IdempotencyKey.key)
+    res = await session.execute(statement)
+    started = res.scalar() is not None
+    await session.commit()
+    return started
+
+
+async def finish_idempotency_key(session: AsyncSession, key: str, record: IdempotencyRecord,
+                                 ttl: datetime.timedelta) -> None:
+    await session.execute(update(IdempotencyKey).where(IdempotencyKey.key == key).values({
+        'status_code': record.status_code,
+        'headers': _encode_headers(record.headers),
+        'body': record.body,
+        'expires_at': func.now() + ttl
+    }))
+    await session.commit()
+
+
+async def discard_idempotency_key(session: AsyncSession, key: str) -> None:
+    await session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+    await session.commit()
+
+
+async def delete_expired_keys(session: AsyncSession) -> None:
+    await session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= func.now()))
+    await session.commit()
+
+
+class DatabaseIdempotencyStore:
+    """Store shared by all api workers"""
+
+    def __init__(self, ttl: int, lease: int):
+        self.ttl = datetime.timedelta(seconds=ttl)
+        self.lease = datetime.timedelta(seconds=lease)
+
+    async def get(self, key: str) -> IdempotencyRecord | None:
+        async with new_session() as session:
+            return await get_idempotency_record(session, key)
+
+    async def start(self, key: str, request_hash: str) -> bool:
+        async with new_session() as session:
+            return await start_idempotency_key(session, key, request_hash, self.lease)
+
+    async def finish(self, key: str, record: IdempotencyRecord) -> None:
+        async with new_session() as session:
+            await finish_idempotency_key(session, key, record, self.ttl)
+
+    async def discard(self, key: str) -> None:
+        async with new_session() as session:
+            await discard_idempotency_key(session, key)
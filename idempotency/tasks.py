@@ -0,0 +1,19 @@
+import asyncio
+
+import db
+from celery_app import celery_app
+from idempotency.db import delete_expired_keys
+
+
+async def _delete_expired_keys() -> None:
+    db.init_engine()
+    try:
+        async with db.async_session() as session:
+            await delete_expired_keys(session)
+    finally:
+        await db.dispose_engine()
+
+
+@celery_app.task
+def delete_expired_idempotency_keys():
+    asyncio.run(_delete_expired_keys())
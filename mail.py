@@ -7,28 +7,57 @@ from starlette import status
 import config
 from celery_app import celery_app
 
-smtp = smtplib.SMTP(host=config.SMTP_HOST, port=config.SMTP_PORT)
+# connection is opened by every celery worker process (see run_celery.py) or lazily on first email, so api process that
+# only calls send_email.delay never connects to smtp server. It must not be opened before prefork pool forks, otherwise
+# child processes share one socket
+smtp: smtplib.SMTP | None = None
 
 
 def init_smtp(**kwargs):
+    global smtp
     if config.SMTP_HOST is None:
         raise RuntimeError("activate .env file before starting celery")
+    smtp = smtplib.SMTP(host=config.SMTP_HOST, port=config.SMTP_PORT)
     smtp.starttls()
     smtp.login(config.SMTP_EMAIL, config.SMTP_PASSWORD)
 
 
 def quit_smtp(**kwargs):
-    smtp.quit()
+    global smtp
+    if smtp is not None:
+        try:
+            smtp.quit()
+        except smtplib.SMTPServerDisconnected:
+            pass
+    smtp = None
 
 
-@celery_app.task
-def send_email(to: list[str] | str, content: str):
-    if isinstance(to, str):
-        to = [to]
+def _send(to: list[str], content: str):
     if any('\r' in addr or '\n' in addr for addr in to):  # preventing header injection
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='email address can not contain \\r or \\n')
+    if smtp is None:
+        init_smtp()
     message = EmailMessage()
     message['From'] = config.SMTP_EMAIL
     message['To'] = ', '.join(to)
     message.set_content(content)
-    smtp.send_message(message)
+    try:
+        smtp.send_message(message)
+    except smtplib.SMTPServerDisconnected:  # server closes connections that were idle for long
+        init_smtp()
+        smtp.send_message(message)
+
+
+# result (delivery status) is stored if result backend is configured, see accounts.get_email_status
+@celery_app.task(ignore_result=config.CELERY_RESULT_BACKEND is None, acks_late=True)
+def send_email(to: list[str] | str, content: str):
+    if isinstance(to, str):
+        to = [to]
+    _send(to, content)
+
+
+@celery_app.task
+def send_bulk_email(recipients: list[str], content: str):
+    """Sends separate email to every recipient, so that recipients do not see each other"""
+    for recipient in recipients:
+        _send([recipient], content)
@@ -1,7 +1,34 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+
+import db
 from accounts import router as accounts_router
 from cart import router as cart_router
+from delivery import router as delivery_router, start_coverage
+from idempotency import IdempotencyMiddleware
+from orders import router as orders_router, events as order_events
+from recommendations import router as recommendations_router
+from staff import router as staff_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.init_engine()
+    await order_events.start_hub()
+    coverage_refresh = await start_coverage()
+    yield
+    coverage_refresh.cancel()
+    await order_events.stop_hub()
+    await db.dispose_engine()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# login response is a bearer token, it is not stored; retrying login is harmless anyway
+app.add_middleware(IdempotencyMiddleware, exclude_paths=['/accounts/login'])
 app.include_router(accounts_router)
 app.include_router(cart_router)
+app.include_router(orders_router)
+app.include_router(staff_router)
+app.include_router(recommendations_router)
+app.include_router(delivery_router)
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+import config
+from accounts import get_current_user_uuid_or_401
+from db import get_async_session, new_session
+from db.models import OrderStatus
+from orders import events
+from orders.db import get_order_status
+from orders.models import OrderStatusDTO
+
+router = APIRouter(prefix='/orders')
+
+
+async def get_order_status_or_404(
+        order_uuid: UUID,
+        user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)],
+        db_session: Annotated[AsyncSession, Depends(get_async_session)]
+) -> OrderStatus:
+    order_status = await get_order_status(db_session, order_uuid, user_uuid)
+    if order_status is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Order not found')
+    return order_status
+
+
+@router.get('/{order_uuid}/status', response_model=OrderStatusDTO)
+async def get_status(order_uuid: UUID, order_status: Annotated[OrderStatus, Depends(get_order_status_or_404)]):
+    return OrderStatusDTO(uuid=order_uuid, status=order_status)
+
+
+async def _status_stream(order_uuid: UUID, user_uuid: UUID):
+    async with events.hub.subscribe(order_uuid) as queue:
+        # status is read after subscribing, so a change made between the check in endpoint and subscribing is not lost
+        async with new_session() as session:
+            order_status = await get_order_status(session, order_uuid, user_uuid)
+        if order_status is None:  # deleted after the check in endpoint
+            return
+        yield f'data: {order_status.value}\n\n'
+        while order_status not in events.FINAL_STATUSES:
+            try:
+                new_status = await asyncio.wait_for(queue.get(), config.ORDER_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if new_status != order_status:  # hub repeats current status after reconnecting to postgres
+                order_status = new_status
+                yield f'data: {order_status.value}\n\n'
+
+
+@router.get('/{order_uuid}/status/stream')
+async def stream_status(order_uuid: UUID, user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)]):
+    """Server-sent events stream of order status. Current status is sent first, stream ends after final status"""
+    if events.hub is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Order events are not available')
+    # session of get_async_session dependency would be closed only after the response, holding a connection for the
+    # whole life of the stream, so the check uses a short session of its own
+    async with new_session() as session:
+        if await get_order_status(session, order_uuid, user_uuid) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Order not found')
+    return StreamingResponse(
+        _status_stream(order_uuid, user_uuid),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
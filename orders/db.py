@@ -0,0 +1,48 @@
+from collections.abc import Sequence
+from uuid import UUID
+
+from sqlalchemy import select, update, text, bindparam, any_, Text, Uuid
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Order, OrderStatus
+from orders import events
+
+_notify_statement = text('SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload') \
+    .bindparams(bindparam('payloads', type_=ARRAY(Text)))
+# uuids are bound as one array: IN with a parameter per uuid fails for more than 32767 subscribed orders
+_orders_statuses_statement = select(Order.uuid, Order.status) \
+    .where(Order.uuid == any_(bindparam('order_uuids', type_=ARRAY(Uuid))))
+
+
+async def get_order_status(session: AsyncSession, order_uuid: UUID, user_uuid: UUID) -> OrderStatus | None:
+    res = await session.execute(select(Order.status).where(Order.uuid == order_uuid, Order.user_uuid == user_uuid))
+    return res.scalar()
+
+
+async def get_orders_statuses(session: AsyncSession, order_uuids: Sequence[UUID]) -> dict[UUID, OrderStatus]:
+    res = await session.execute(_orders_statuses_statement, {'order_uuids': list(order_uuids)})
+    return {order_uuid: status for order_uuid, status in res}
+
+
+async def notify_status_changed(session: AsyncSession, order_uuids: Sequence[UUID], status: OrderStatus) -> None:
+    """Must be called in transaction that changed status, before commit: notification is delivered to listeners only
+    when transaction commits"""
+    if order_uuids:
+        await session.execute(_notify_statement, {
+            'channel': events.ORDER_STATUS_CHANNEL,
+            'payloads': [events.encode_status_event(order_uuid, status) for order_uuid in order_uuids]
+        })
+
+
+async def publish_committed_status_change(order_uuids: Sequence[UUID], status: OrderStatus) -> None:
+    if events.hub is not None:
+        for order_uuid in order_uuids:
+            await events.hub.publish_committed(order_uuid, status)
+
+
+async def update_order_status(session: AsyncSession, order_uuid: UUID, status: OrderStatus) -> None:
+    await session.execute(update(Order).where(Order.uuid == order_uuid).values({'status': status}))
+    await notify_status_changed(session, [order_uuid], status)
+    await session.commit()
+    await publish_committed_status_change([order_uuid], status)
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from uuid import UUID
+
+import config
+from db.models import OrderStatus
+
+logger = logging.getLogger(__name__)
+
+ORDER_STATUS_CHANNEL = 'order_status'
+
+FINAL_STATUSES = frozenset({OrderStatus.done, OrderStatus.canceled, OrderStatus.returned})
+
+
+def encode_status_event(order_uuid: UUID, status: OrderStatus) -> str:
+    return f'{order_uuid.hex}:{status.value}'
+
+
+def decode_status_event(payload: str) -> tuple[UUID, OrderStatus]:
+    order_uuid, status = payload.split(':', 1)
+    return UUID(order_uuid), OrderStatus(status)
+
+
+class InMemoryPubSub:
+    """Delivers events published in this process only. Used when there is no postgres (development, tests)"""
+
+    def __init__(self):
+        self._callback: Callable[[str], None] | None = None
+
+    async def start(self, callback: Callable[[str], None], on_reconnect: Callable[[], Awaitable[None]]) -> None:
+        self._callback = callback
+
+    async def stop(self) -> None:
+        self._callback = None
+
+    async def publish_committed(self, payload: str) -> None:
+        if self._callback is not None:
+            self._callback(payload)
+
+
+class PostgresPubSub:
+    """Listens to postgres NOTIFY on a single dedicated connection per process. Lost connection (database restart,
+    failover) is reestablished with backoff, notifications sent while it was down are lost, so on_reconnect is called
+    to catch up"""
+
+    reconnect_delays = (0.5, 1, 2, 5, 10, 30)  # seconds, the last one is repeated
+
+    def __init__(self, dsn: str, channel: str):
+        self._dsn = dsn
+        self._channel = channel
+        self._connection = None
+        self._callback: Callable[[str], None] | None = None
+        self._on_reconnect: Callable[[], Awaitable[None]] | None = None
+        self._reconnecting: asyncio.Task | None = None
+
+    async def start(self, callback: Callable[[str], None], on_reconnect: Callable[[], Awaitable[None]]) -> None:
+        """Does not fail if database is unavailable, connection is retried in background"""
+        self._callback = callback
+        self._on_reconnect = on_reconnect
+        try:
+            await self._connect()
+        except Exception as error:
+            logger.warning('could not listen to %s: %r, retrying', self._channel, error)
+            self._schedule_reconnect()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(self._dsn)
+        connection.add_termination_listener(self._on_terminated)
+        await connection.add_listener(
+            self._channel, lambda connection, pid, channel, payload: self._callback(payload)
+        )
+        self._connection = connection
+
+    def _on_terminated(self, connection) -> None:
+        if connection is not self._connection:  # closed by stop
+            return
+        self._connection = None
+        logger.warning('connection listening to %s is lost, reconnecting', self._channel)
+        self._schedule_reconnect()
+
+    def _schedule_reconnect(self) -> None:
+        if self._reconnecting is None or self._reconnecting.done():
+            self._reconnecting = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.reconnect_delays[min(attempt, len(self.reconnect_delays) - 1)])
+            attempt += 1
+            try:
+                await self._connect()
+            except Exception as error:
+                logger.warning('could not listen to %s: %r, retrying', self._channel, error)
+                continue
+            logger.info('listening to %s again', self._channel)
+            try:
+                await self._on_reconnect()
+            except Exception:
+                logger.exception('failed to catch up after reconnecting to %s', self._channel)
+            return
+
+    async def stop(self) -> None:
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+
+    async def publish_committed(self, payload: str) -> None:
+        pass  # NOTIFY is sent by the transaction that changed status (see orders.db.update_order_status)
+
+
+class OrderStatusHub:
+    """Fans out order status events to subscribers of this process. Every subscriber is just a small queue, so idle
+    connection costs no database queries and almost no memory"""
+
+    subscriber_queue_size = 8
+
+    def __init__(self, pubsub: InMemoryPubSub | PostgresPubSub):
+        self.pubsub = pubsub
+        self._subscribers: defaultdict[UUID, set[asyncio.Queue]] = defaultdict(set)
+
+    async def start(self) -> None:
+        await self.pubsub.start(self._dispatch, self._resend_current_statuses)
+
+    async def stop(self) -> None:
+        await self.pubsub.stop()
+
+    async def publish_committed(self, order_uuid: UUID, status: OrderStatus) -> None:
+        await self.pubsub.publish_committed(encode_status_event(order_uuid, status))
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            order_uuid, status = decode_status_event(payload)
+        except ValueError:
+            logger.warning('invalid order status event: %r', payload)
+            return
+        self._send(order_uuid, status)
+
+    def _send(self, order_uuid: UUID, status: OrderStatus) -> None:
+        for queue in self._subscribers.get(order_uuid, ()):
+            if queue.full():  # slow subscriber is only interested in the latest status
+                queue.get_nowait()
+            queue.put_nowait(status)
+
+    async def _resend_current_statuses(self) -> None:
+        """Sends current status of every subscribed order, changes made while events were not delivered are not lost"""
+        from db import new_session
+        from orders.db import get_orders_statuses
+
+        if not self._subscribers:
+            return
+        async with new_session() as session:
+            statuses = await get_orders_statuses(session, list(self._subscribers))
+        for order_uuid, status in statuses.items():
+            self._send(order_uuid, status)
+
+    @asynccontextmanager
+    async def subscribe(self, order_uuid: UUID) -> AsyncIterator[asyncio.Queue]:
+        queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers[order_uuid].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers[order_uuid]
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[order_uuid]
+
+
+def create_hub() -> OrderStatusHub:
+    if config.ORDER_EVENTS_BACKEND == 'memory':
+        return OrderStatusHub(InMemoryPubSub())
+    from db import SQLALCHEMY_DB_URL
+    return OrderStatusHub(PostgresPubSub(SQLALCHEMY_DB_URL.replace('+asyncpg', ''), ORDER_STATUS_CHANNEL))
+
+
+hub: OrderStatusHub | None = None
+
+
+async def start_hub() -> None:
+    global hub
+    hub = create_hub()
+    await hub.start()
+
+
+async def stop_hub() -> None:
+    global hub
+    if hub is not None:
+        await hub.stop()
+    hub = None
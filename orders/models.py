@@ -0,0 +1,10 @@
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from db.models import OrderStatus
+
+
+class OrderStatusDTO(BaseModel):
+    uuid: UUID
+    status: OrderStatus
@@ -0,0 +1,114 @@
+import datetime
+import gzip
+import os
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from orders.events import FINAL_STATUSES
+
+# tables partitioned by month of order creation. product_order references orders, so its partitions are detached first
+PARTITIONED_TABLES = ('product_order', 'orders')
+
+ARCHIVE_SCHEMA = 'archive'
+DETACH_LOCK_TIMEOUT = '5s'
+
+
+def month_start(date: datetime.date) -> datetime.date:
+    return date.replace(day=1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return datetime.date(year, month_index + 1, 1)
+
+
+def partition_name(table: str, month: datetime.date) -> str:
+    return f'{table}_y{month.year}m{month.month:02}'
+
+
+def partition_month(table: str, name: str) -> datetime.date | None:
+    suffix = name.removeprefix(f'{table}_y')
+    if suffix == name or len(suffix) != 7 or suffix[4] != 'm' or not (suffix[:4] + suffix[5:]).isdigit():
+        return
+    return datetime.date(int(suffix[:4]), int(suffix[5:]), 1)
+
+
+async def get_partitions(session: AsyncSession, table: str) -> list[str]:
+    res = await session.execute(text(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class parent ON pg_inherits.inhparent = parent.oid '
+        'JOIN pg_class child ON pg_inherits.inhrelid = child.oid '
+        'WHERE parent.relname = :table'
+    ), {'table': table})
+    return list(res.scalars())
+
+
+async def create_partitions(session: AsyncSession, first_month: datetime.date, months: int) -> list[str]:
+    created = []
+    for i in range(months):
+        month = add_months(first_month, i)
+        for table in PARTITIONED_TABLES:
+            name = partition_name(table, month)
+            if await session.scalar(text('SELECT to_regclass(:name)'), {'name': name}) is not None:
+                continue
+            await session.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            created.append(name)
+    await session.commit()
+    return created
+
+
+async def has_active_orders(session: AsyncSession, partition: str) -> bool:
+    final = ', '.join(f"'{status.value}'" for status in FINAL_STATUSES)
+    res = await session.execute(text(f'SELECT 1 FROM {partition} WHERE status NOT IN ({final}) LIMIT 1'))
+    return res.scalar() is not None
+
+
+async def _export_table(session: AsyncSession, table: str, directory: str) -> str:
+    path = os.path.join(directory, f'{table}.csv.gz')
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    with gzip.open(path, 'wb') as file:
+        async def write(chunk: bytes):
+            file.write(chunk)
+        await raw_connection.driver_connection.copy_from_table(table, output=write, format='csv', header=True)
+    return path
+
+
+async def archive_month(session: AsyncSession, month: datetime.date, export_directory: str | None = None) -> bool:
+    """Detaches partitions of given month from orders and product_order. Detached tables are moved to archive schema,
+    or, if export_directory is given, exported to gzipped csv files and dropped. Partition that still has not
+    finished orders is left in place. Returns whether month was archived.
+    DETACH locks orders and product_order exclusively, so export runs before it, while partitions are attached (it only
+    reads them, queries of other months are not blocked), and the transaction that detaches them contains catalog
+    changes only"""
+    orders_partition = partition_name('orders', month)
+    if await has_active_orders(session, orders_partition):
+        return False
+    if export_directory is not None:
+        os.makedirs(export_directory, exist_ok=True)
+        for table in PARTITIONED_TABLES:
+            await _export_table(session, partition_name(table, month), export_directory)
+        await session.commit()
+    # waiting for the lock would block every query of orders that comes after; next run retries
+    await session.execute(text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+    for table in PARTITIONED_TABLES:
+        partition = partition_name(table, month)
+        await session.execute(text(f'ALTER TABLE {table} DETACH PARTITION {partition}'))
+        # detached table keeps its own copies of foreign keys to orders, they would prevent detaching orders partition
+        foreign_keys = await session.execute(text(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:partition) AND contype = 'f' AND confrelid = 'orders'::regclass"
+        ), {'partition': partition})
+        for foreign_key in foreign_keys.scalars().all():
+            await session.execute(text(f'ALTER TABLE {partition} DROP CONSTRAINT {foreign_key}'))
+        if export_directory is None:
+            await session.execute(text(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}'))
+            await session.execute(text(f'ALTER TABLE {partition} SET SCHEMA {ARCHIVE_SCHEMA}'))
+        else:
+            await session.execute(text(f'DROP TABLE {partition}'))
+    await session.commit()
+    return True
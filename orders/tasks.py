@@ -0,0 +1,39 @@
+import asyncio
+import datetime
+import logging
+
+import config
+import db
+from celery_app import celery_app
+from orders.partitions import create_partitions, get_partitions, partition_month, archive_month, month_start, \
+    add_months
+
+logger = logging.getLogger(__name__)
+
+
+async def _maintain_partitions() -> None:
+    db.init_engine()
+    try:
+        async with db.async_session() as session:
+            current_month = month_start(datetime.date.today())
+            await create_partitions(session, current_month, config.ORDERS_PARTITIONS_AHEAD + 1)
+            archive_before = add_months(current_month, -config.ORDERS_HOT_MONTHS)
+            months = sorted(filter(None, (
+                partition_month('orders', name) for name in await get_partitions(session, 'orders')
+            )))
+            for month in months:
+                if month >= archive_before:
+                    break
+                export_directory = None
+                if config.ORDERS_ARCHIVE_DIR is not None:
+                    export_directory = f'{config.ORDERS_ARCHIVE_DIR}/{month:%Y-%m}'
+                if not await archive_month(session, month, export_directory):
+                    # month stays attached (and scanned by queries) until its last order is finished
+                    logger.warning('orders of %s are not archived, some of them are not finished', f'{month:%Y-%m}')
+    finally:
+        await db.dispose_engine()
+
+
+@celery_app.task
+def maintain_order_partitions():
+    asyncio.run(_maintain_partitions())
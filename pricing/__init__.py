@@ -0,0 +1,74 @@
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import NamedTuple, Protocol
+from uuid import UUID
+
+# all prices are integers in minimal currency units (cents), so pricing is exact. Rounding of percent discounts is
+# done once per line (product discount applied to price * amount) and once per cart rule, half up.
+# Prices carts only: price of order is fixed when it is created (see db.models.Order.price), later changes of products
+# must not change it
+
+
+class Line(NamedTuple):
+    product_uuid: UUID
+    price: int  # price of one product, without discount
+    discount: int  # percent, 0..100
+    amount: int
+
+
+class DiscountRule(Protocol):
+    def apply(self, total: int) -> int:
+        ...
+
+
+@dataclass(frozen=True, slots=True)
+class PercentDiscount:
+    percent: int
+    min_total: int = 0
+
+    def apply(self, total: int) -> int:
+        if total < self.min_total:
+            return total
+        return apply_percent(total, self.percent)
+
+
+@dataclass(frozen=True, slots=True)
+class FixedDiscount:
+    amount: int
+    min_total: int = 0
+
+    def apply(self, total: int) -> int:
+        if total < self.min_total:
+            return total
+        return max(total - self.amount, 0)
+
+
+@dataclass(frozen=True, slots=True)
+class Price:
+    subtotal: int  # without any discounts
+    products_total: int  # with product discounts only
+    total: int  # with product discounts and rules
+
+    @property
+    def discount(self) -> int:
+        return self.subtotal - self.total
+
+
+def apply_percent(value: int, percent: int) -> int:
+    return (value * (100 - percent) + 50) // 100
+
+
+def price_lines(lines: Iterable[Line], rules: Iterable[DiscountRule] = ()) -> Price:
+    subtotal = products_total = 0
+    for _, price, discount, amount in lines:
+        subtotal += price * amount
+        products_total += apply_percent(price * amount, discount)
+    total = products_total
+    for rule in rules:
+        total = rule.apply(total)
+    return Price(subtotal, products_total, total)
+
+
+def price_carts(carts: Mapping[UUID, Iterable[Line]], rules: Iterable[DiscountRule] = ()) -> dict[UUID, Price]:
+    rules = tuple(rules)
+    return {user_uuid: price_lines(lines, rules) for user_uuid, lines in carts.items()}
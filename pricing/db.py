@@ -0,0 +1,58 @@
+import datetime
+from collections import defaultdict
+from collections.abc import Iterable
+from uuid import UUID
+
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import product_user_association_table, Product, PromoCode
+from pricing import Line, Price, price_carts, DiscountRule, PercentDiscount, FixedDiscount
+
+_cart_lines_statement = select(
+    product_user_association_table.c.product_uuid,
+    Product.price,
+    Product.discount,
+    product_user_association_table.c.amount
+).join(Product)
+
+
+async def get_cart_lines(session: AsyncSession, user_uuid: UUID) -> list[Line]:
+    statement = _cart_lines_statement.where(product_user_association_table.c.user_uuid == user_uuid)
+    res = await session.execute(statement)
+    return [Line(*row) for row in res]
+
+
+async def get_carts_lines_with_products(session: AsyncSession, product_uuids: Iterable[UUID]) -> dict[UUID, list[Line]]:
+    """Returns all lines of every cart that contains at least one of given products, grouped by user uuid. Used to
+    reprice carts after price of products changes"""
+    carts = select(product_user_association_table.c.user_uuid) \
+        .where(product_user_association_table.c.product_uuid.in_(list(product_uuids)))
+    statement = _cart_lines_statement \
+        .add_columns(product_user_association_table.c.user_uuid) \
+        .where(product_user_association_table.c.user_uuid.in_(carts))
+    res = await session.execute(statement)
+    carts_lines = defaultdict(list)
+    for product_uuid, price, discount, amount, user_uuid in res:
+        carts_lines[user_uuid].append(Line(product_uuid, price, discount, amount))
+    return carts_lines
+
+
+async def reprice_carts(session: AsyncSession, product_uuids: Iterable[UUID]) -> dict[UUID, Price]:
+    return price_carts(await get_carts_lines_with_products(session, product_uuids))
+
+
+async def get_promo_code_rules(session: AsyncSession, promo_code: str | None) -> tuple[DiscountRule, ...] | None:
+    """Rules applied (in order) after product discounts. Returns None if promo code does not exist or is expired"""
+    if promo_code is None:
+        return ()
+    res = await session.execute(select(PromoCode).where(
+        PromoCode.code == promo_code,
+        or_(PromoCode.valid_until.is_(None), PromoCode.valid_until > datetime.datetime.now())
+    ))
+    code = res.scalar()
+    if code is None:
+        return
+    if code.percent is not None:
+        return PercentDiscount(code.percent, code.min_total),
+    return FixedDiscount(code.amount, code.min_total),
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class PriceDTO(BaseModel):
+    subtotal: int
+    products_total: int
+    total: int
+    discount: int
@@ -0,0 +1,46 @@
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from accounts import get_current_user_uuid_or_401
+from cart.db import get_user_product_uuids
+from db import get_async_session
+from recommendations.index import RecommendationIndex, current_version
+
+router = APIRouter(prefix='/recommendations')
+
+_index: RecommendationIndex | None = None
+
+
+def get_index() -> RecommendationIndex | None:
+    """Returns index of the latest version, index is reloaded when celery task builds new one"""
+    global _index
+    version = current_version(config.RECOMMENDATIONS_DIR)
+    if version is None:
+        return
+    if _index is None or _index.version != version:
+        _index = RecommendationIndex(version)
+    return _index
+
+
+@router.get('/products/{product_uuid}', response_model=list[UUID])
+async def get_also_bought(product_uuid: UUID, limit: Annotated[int, Query(ge=1, le=50)] = 10):
+    index = get_index()
+    if index is None:
+        return []
+    return index.similar(product_uuid, limit)
+
+
+@router.get('/cart', response_model=list[UUID])
+async def get_cart_recommendations(
+        user_uuid: Annotated[UUID, Depends(get_current_user_uuid_or_401)],
+        db_session: Annotated[AsyncSession, Depends(get_async_session)],
+        limit: Annotated[int, Query(ge=1, le=50)] = 10
+):
+    index = get_index()
+    if index is None:
+        return []
+    return index.for_products(await get_user_product_uuids(db_session, user_uuid), limit)
@@ -0,0 +1,129 @@
+import datetime
+import fcntl
+import json
+import os
+import shutil
+from collections.abc import Iterable, Sequence
+from contextlib import contextmanager
+from uuid import UUID
+
+import numpy as np
+from scipy import sparse
+
+from recommendations.index import CURRENT, products_lookup
+
+# weights of signals in co-occurrence matrix. Products bought in the same order are the strongest signal
+ORDER_WEIGHT = 1.0
+CART_WEIGHT = 0.5
+FAVORITES_WEIGHT = 0.5
+
+KEEP_VERSIONS = 2
+
+LOCK = 'build.lock'
+
+
+def baskets_cooccurrence(baskets: Iterable[tuple[UUID, UUID]], product_index: dict[UUID, int]) -> sparse.csr_matrix:
+    """Returns products x products matrix, where cell is number of baskets that contain both products. Products that
+    are not in product_index are added to it"""
+    basket_index = {}
+    rows = []
+    cols = []
+    for basket_uuid, product_uuid in baskets:
+        rows.append(basket_index.setdefault(basket_uuid, len(basket_index)))
+        cols.append(product_index.setdefault(product_uuid, len(product_index)))
+    baskets_matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(basket_index), len(product_index))
+    )
+    baskets_matrix.data[:] = 1  # product is counted once per basket
+    return (baskets_matrix.T @ baskets_matrix).tocsr()
+
+
+def resize(matrix: sparse.csr_matrix, size: int) -> sparse.csr_matrix:
+    matrix = matrix.tocsr(copy=True)
+    matrix.resize((size, size))
+    return matrix
+
+
+def top_k(
+        cooccurrence: sparse.csr_matrix,
+        k: int,
+        rows: Sequence[int] | None = None,
+        neighbors: np.ndarray | None = None,
+        scores: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns k most similar products (cosine similarity of co-occurrence) for every product, or recomputes only
+    given rows of existing neighbors and scores. Missing neighbors are -1"""
+    size = cooccurrence.shape[0]
+    if neighbors is None:
+        neighbors = np.full((size, k), -1, dtype=np.int32)
+        scores = np.zeros((size, k), dtype=np.float32)
+    norms = np.sqrt(cooccurrence.diagonal())
+    norms[norms == 0] = 1
+    for row in range(size) if rows is None else rows:
+        start, end = cooccurrence.indptr[row], cooccurrence.indptr[row + 1]
+        cols = cooccurrence.indices[start:end]
+        similarity = cooccurrence.data[start:end] / (norms[row] * norms[cols])
+        similarity[cols == row] = 0
+        count = min(k, np.count_nonzero(similarity))
+        best = np.argpartition(-similarity, count - 1)[:count] if count else np.empty(0, dtype=np.int64)
+        best = best[np.argsort(-similarity[best], kind='stable')]
+        neighbors[row] = -1
+        scores[row] = 0
+        neighbors[row, :count] = cols[best]
+        scores[row, :count] = similarity[best]
+    return neighbors, scores
+
+
+@contextmanager
+def locked(directory: str):
+    """Serializes builds and updates of index in directory. Update started during full build would otherwise replace
+    its result with stale version, and both would switch `current` symlink at the same time"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK), 'w') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        yield
+
+
+def save(
+        directory: str,
+        products: Sequence[UUID],
+        cooccurrence: sparse.csr_matrix,
+        neighbors: np.ndarray,
+        scores: np.ndarray,
+        watermark: datetime.datetime
+) -> str:
+    """Writes new index version and atomically switches `current` symlink to it. Must be called under `locked`"""
+    version = os.path.join(directory, datetime.datetime.now().strftime('%Y%m%d%H%M%S%f'))
+    os.makedirs(version)
+    products_array = np.frombuffer(b''.join(product.bytes for product in products), dtype=np.uint8)
+    products_array = products_array.reshape(len(products), 16)
+    np.save(os.path.join(version, 'products.npy'), products_array)
+    for name, array in zip(('sorted_high', 'sorted_low', 'sorted_rows'), products_lookup(products_array)):
+        np.save(os.path.join(version, f'{name}.npy'), array)
+    np.save(os.path.join(version, 'neighbors.npy'), neighbors)
+    np.save(os.path.join(version, 'scores.npy'), scores)
+    sparse.save_npz(os.path.join(version, 'cooccurrence.npz'), cooccurrence)
+    with open(os.path.join(version, 'meta.json'), 'w') as file:
+        json.dump({'watermark': watermark.isoformat()}, file)
+
+    tmp_link = os.path.join(directory, CURRENT + '.tmp')
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.basename(version), tmp_link)
+    os.replace(tmp_link, os.path.join(directory, CURRENT))
+
+    versions = sorted(name for name in os.listdir(directory) if name.isdigit())
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return version
+
+
+def load_for_update(version: str) -> tuple[list[UUID], sparse.csr_matrix, np.ndarray, np.ndarray, datetime.datetime]:
+    products = [UUID(bytes=row.tobytes()) for row in np.load(os.path.join(version, 'products.npy'))]
+    cooccurrence = sparse.load_npz(os.path.join(version, 'cooccurrence.npz')).tocsr()
+    neighbors = np.load(os.path.join(version, 'neighbors.npy'))
+    scores = np.load(os.path.join(version, 'scores.npy'))
+    with open(os.path.join(version, 'meta.json')) as file:
+        watermark = datetime.datetime.fromisoformat(json.load(file)['watermark'])
+    return products, cooccurrence, neighbors, scores, watermark
@@ -0,0 +1,43 @@
+import datetime
+from uuid import UUID
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import product_order_association_table, product_user_association_table, user_favorite_products
+
+
+async def get_db_now(session: AsyncSession) -> datetime.datetime:
+    res = await session.execute(select(func.now()))
+    return res.scalar()
+
+
+async def get_order_baskets(
+        session: AsyncSession,
+        created_after: datetime.datetime | None = None,
+        created_before: datetime.datetime | None = None
+) -> list[tuple[UUID, UUID]]:
+    """Returns (order_uuid, product_uuid) pairs. Filtering by order_created_at (partition key of product_order) instead
+    of joining orders lets postgres scan only product_order partitions of given period"""
+    table = product_order_association_table
+    statement = select(table.c.order_uuid, table.c.product_uuid)
+    if created_after is not None:
+        statement = statement.where(table.c.order_created_at > created_after)
+    if created_before is not None:
+        statement = statement.where(table.c.order_created_at <= created_before)
+    res = await session.execute(statement)
+    return [(row[0], row[1]) for row in res]
+
+
+async def get_cart_baskets(session: AsyncSession) -> list[tuple[UUID, UUID]]:
+    """Returns (user_uuid, product_uuid) pairs"""
+    res = await session.execute(select(
+        product_user_association_table.c.user_uuid, product_user_association_table.c.product_uuid
+    ))
+    return [(row[0], row[1]) for row in res]
+
+
+async def get_favorites_baskets(session: AsyncSession) -> list[tuple[UUID, UUID]]:
+    """Returns (user_uuid, product_uuid) pairs"""
+    res = await session.execute(select(user_favorite_products.c.user_uuid, user_favorite_products.c.product_uuid))
+    return [(row[0], row[1]) for row in res]
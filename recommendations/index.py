@@ -0,0 +1,70 @@
+import os
+from collections.abc import Iterable
+from uuid import UUID
+
+import numpy as np
+
+CURRENT = 'current'  # symlink to directory of the latest index version
+
+
+def current_version(directory: str) -> str | None:
+    path = os.path.join(directory, CURRENT)
+    if not os.path.lexists(path):
+        return
+    return os.path.realpath(path)
+
+
+def products_lookup(products: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Products (rows of 16 uuid bytes) sorted for binary search: high and low halves of uuids and rows of products"""
+    halves = np.ascontiguousarray(products).view('>u8')
+    order = np.lexsort((halves[:, 1], halves[:, 0]))
+    return halves[order, 0].copy(), halves[order, 1].copy(), order.astype(np.int32)
+
+
+class RecommendationIndex:
+    """Read-only index used by api. Arrays are memory-mapped, so workers share them through page cache, and loading
+    new version costs no more than opening files"""
+
+    def __init__(self, version: str):
+        self.version = version
+        self.products = np.load(os.path.join(version, 'products.npy'), mmap_mode='r')
+        if os.path.exists(os.path.join(version, 'sorted_rows.npy')):
+            self.sorted_high, self.sorted_low, self.sorted_rows = (
+                np.load(os.path.join(version, f'{name}.npy'), mmap_mode='r')
+                for name in ('sorted_high', 'sorted_low', 'sorted_rows')
+            )
+        else:  # version saved before lookup arrays were added
+            self.sorted_high, self.sorted_low, self.sorted_rows = products_lookup(self.products)
+        self.neighbors = np.load(os.path.join(version, 'neighbors.npy'), mmap_mode='r')
+        self.scores = np.load(os.path.join(version, 'scores.npy'), mmap_mode='r')
+
+    def row(self, product_uuid: UUID) -> int | None:
+        high, low = np.uint64(product_uuid.int >> 64), np.uint64(product_uuid.int & (1 << 64) - 1)
+        start = np.searchsorted(self.sorted_high, high, 'left')
+        end = np.searchsorted(self.sorted_high, high, 'right')
+        i = start + np.searchsorted(self.sorted_low[start:end], low)
+        if i == end or self.sorted_low[i] != low:
+            return
+        return int(self.sorted_rows[i])
+
+    def product(self, row: int) -> UUID:
+        return UUID(bytes=self.products[row].tobytes())
+
+    def similar(self, product_uuid: UUID, limit: int) -> list[UUID]:
+        row = self.row(product_uuid)
+        if row is None:
+            return []
+        return [self.product(i) for i in self.neighbors[row, :limit] if i >= 0]
+
+    def for_products(self, product_uuids: Iterable[UUID], limit: int) -> list[UUID]:
+        """Recommendations for a set of products (e.g. cart): neighbors of all products ranked by sum of scores"""
+        rows = [row for row in map(self.row, product_uuids) if row is not None]
+        if not rows:
+            return []
+        neighbors = self.neighbors[rows]
+        valid = neighbors >= 0
+        candidates, inverse = np.unique(neighbors[valid], return_inverse=True)
+        totals = np.bincount(inverse, weights=self.scores[rows][valid])
+        totals[np.isin(candidates, rows)] = -1  # products that are already in the set are not recommended
+        best = np.argsort(-totals, kind='stable')[:limit]
+        return [self.product(candidates[i]) for i in best if totals[i] > 0]
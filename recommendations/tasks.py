@@ -0,0 +1,87 @@
+import asyncio
+import datetime
+
+import numpy as np
+
+import config
+import db
+from celery_app import celery_app
+from recommendations import build
+from recommendations.index import current_version
+from recommendations.db import get_db_now, get_order_baskets, get_cart_baskets, get_favorites_baskets
+
+# orders are taken into account only when they are older than this, so that order that was created (and got its
+# created_at) but was not committed yet when index was updated, is not skipped forever
+ORDERS_LAG = datetime.timedelta(minutes=5)
+
+
+async def _fetch_full():
+    db.init_engine()
+    try:
+        async with db.async_session() as session:
+            watermark = await get_db_now(session) - ORDERS_LAG
+            orders = await get_order_baskets(session, created_before=watermark)
+            carts = await get_cart_baskets(session)
+            favorites = await get_favorites_baskets(session)
+    finally:
+        await db.dispose_engine()
+    return watermark, orders, carts, favorites
+
+
+async def _fetch_new_orders(since: datetime.datetime):
+    db.init_engine()
+    try:
+        async with db.async_session() as session:
+            watermark = await get_db_now(session) - ORDERS_LAG
+            orders = await get_order_baskets(session, created_after=since, created_before=watermark)
+    finally:
+        await db.dispose_engine()
+    return watermark, orders
+
+
+def _build() -> None:
+    watermark, orders, carts, favorites = asyncio.run(_fetch_full())
+    product_index = {}
+    weighted = [
+        (build.ORDER_WEIGHT, build.baskets_cooccurrence(orders, product_index)),
+        (build.CART_WEIGHT, build.baskets_cooccurrence(carts, product_index)),
+        (build.FAVORITES_WEIGHT, build.baskets_cooccurrence(favorites, product_index)),
+    ]
+    size = len(product_index)
+    cooccurrence = sum(weight * build.resize(matrix, size) for weight, matrix in weighted).tocsr()
+    neighbors, scores = build.top_k(cooccurrence, config.RECOMMENDATIONS_TOP_K)
+    build.save(config.RECOMMENDATIONS_DIR, list(product_index), cooccurrence, neighbors, scores, watermark)
+
+
+def _update() -> None:
+    version = current_version(config.RECOMMENDATIONS_DIR)
+    if version is None:
+        return _build()
+    products, cooccurrence, neighbors, scores, since = build.load_for_update(version)
+    watermark, orders = asyncio.run(_fetch_new_orders(since))
+    if not orders:
+        return
+    product_index = {product: i for i, product in enumerate(products)}
+    delta = build.baskets_cooccurrence(orders, product_index)
+    size = len(product_index)
+    cooccurrence = (build.resize(cooccurrence, size) + build.ORDER_WEIGHT * build.resize(delta, size)).tocsr()
+    new_rows = size - len(products)
+    neighbors = np.vstack([neighbors, np.full((new_rows, neighbors.shape[1]), -1, dtype=neighbors.dtype)])
+    scores = np.vstack([scores, np.zeros((new_rows, scores.shape[1]), dtype=scores.dtype)])
+    touched = np.unique(delta.nonzero()[0])
+    neighbors, scores = build.top_k(cooccurrence, neighbors.shape[1], touched, neighbors, scores)
+    build.save(config.RECOMMENDATIONS_DIR, list(product_index), cooccurrence, neighbors, scores, watermark)
+
+
+@celery_app.task
+def build_recommendations():
+    with build.locked(config.RECOMMENDATIONS_DIR):
+        _build()
+
+
+@celery_app.task
+def update_recommendations():
+    """Adds orders made since last build or update to index. Only neighbors of products from new orders are
+    recomputed; carts and favorites are refreshed by full build"""
+    with build.locked(config.RECOMMENDATIONS_DIR):
+        _update()
@@ -1,8 +1,21 @@
-from celery.signals import worker_shutdown, worker_init
+from celery.signals import worker_process_init, worker_process_shutdown
 
 from celery_app import celery_app
+import idempotency.tasks
 import mail
+import orders.tasks
+import recommendations.tasks
 
+# workers are started per queue, so that prefetch and concurrency fit the tasks:
+#   transactional emails, low latency: every worker process takes one task at a time and acknowledges it after it
+#   is sent, so a slow smtp call never holds other emails in prefetch buffer
+#     celery -A run_celery worker -Q transactional -n transactional@%h -c 4 --prefetch-multiplier 1 -O fair
+#   bulk mailing and maintenance, throughput:
+#     celery -A run_celery worker -Q bulk,maintenance -n bulk@%h -c 2 --prefetch-multiplier 16
+#   periodic tasks:
+#     celery -A run_celery beat
 
-worker_init.connect(mail.init_smtp)
-worker_shutdown.connect(mail.quit_smtp)
+
+# in every pool process after fork (see mail.smtp)
+worker_process_init.connect(mail.init_smtp)
+worker_process_shutdown.connect(mail.quit_smtp)
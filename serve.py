@@ -0,0 +1,114 @@
+"""Runs api server.
+
+Usage: python serve.py [--workers N] [--host HOST] [--port PORT] [--loop auto|asyncio|uvloop]
+                       [--http auto|h11|httptools] [--no-preload] [--reload]
+
+With more than one worker gunicorn is used as process manager (if it is installed), otherwise uvicorn runs workers
+itself. uvloop and httptools are used when they are installed, unless --loop/--http say otherwise.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+import config
+import db
+
+APP = 'main:app'
+
+
+def default_workers_count() -> int:
+    if config.WEB_CONCURRENCY:
+        return int(config.WEB_CONCURRENCY)
+    try:
+        cpus = len(os.sched_getaffinity(0))  # respects cpu affinity (e.g. taskset, some container runtimes)
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # app is async and io bound, so one worker per cpu is enough to saturate cpus
+    return max(cpus, 1)
+
+
+def resolve_loop(loop: str) -> str:
+    if loop == 'auto':
+        return 'uvloop' if importlib.util.find_spec('uvloop') else 'asyncio'
+    return loop
+
+
+def resolve_http(http: str) -> str:
+    if http == 'auto':
+        return 'httptools' if importlib.util.find_spec('httptools') else 'h11'
+    return http
+
+
+def run_uvicorn(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else args.workers,
+        loop=resolve_loop(args.loop),
+        http=resolve_http(args.http),
+        reload=args.reload,
+        timeout_graceful_shutdown=config.GRACEFUL_TIMEOUT,
+    )
+
+
+def run_gunicorn(args: argparse.Namespace) -> None:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        CONFIG_KWARGS = {
+            'loop': resolve_loop(args.loop),
+            'http': resolve_http(args.http),
+            'timeout_graceful_shutdown': config.GRACEFUL_TIMEOUT,
+        }
+
+    def post_fork(server, worker):
+        # with preload app is imported in master process; engine is created lazily in lifespan, but if anything
+        # created it before fork, child must not share pool's connections with parent and other workers
+        db.reset_engine_after_fork()
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{args.host}:{args.port}')
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('worker_class', Worker)
+            self.cfg.set('preload_app', args.preload)
+            self.cfg.set('graceful_timeout', config.GRACEFUL_TIMEOUT)
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Run internetshop api server')
+    parser.add_argument('--host', default=config.SERVE_HOST)
+    parser.add_argument('--port', type=int, default=config.SERVE_PORT)
+    parser.add_argument('--workers', type=int, default=default_workers_count())
+    parser.add_argument('--loop', choices=['auto', 'asyncio', 'uvloop'], default='auto')
+    parser.add_argument('--http', choices=['auto', 'h11', 'httptools'], default='auto')
+    parser.add_argument('--no-preload', dest='preload', action='store_false', help='import app in every worker')
+    parser.add_argument('--reload', action='store_true', help='restart on code changes (development only)')
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.workers > 1 and config.IDEMPOTENCY_BACKEND == 'memory':
+        print('warning: IDEMPOTENCY_BACKEND=memory is not shared between workers, retries with Idempotency-Key that '
+              'get to another worker are handled again', file=sys.stderr)
+    if args.workers > 1 and not args.reload and importlib.util.find_spec('gunicorn'):
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
+
+if __name__ == '__main__':
+    main()
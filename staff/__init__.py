@@ -0,0 +1,92 @@
+import datetime
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Body, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from accounts.dependencies import AuthContext, require_role
+from db import get_async_session
+from db.models import UserRole, OrderStatus
+from staff.db import claim_orders, transition_claimed_orders, extend_claims, release_claims
+from staff.models import ClaimedOrderDTO
+
+router = APIRouter(prefix='/staff')
+
+lease = datetime.timedelta(seconds=config.STAFF_CLAIM_LEASE)
+
+WarehouseWorker = Annotated[AuthContext, Depends(require_role(UserRole.warehouse_worker))]
+Courier = Annotated[AuthContext, Depends(require_role(UserRole.courier))]
+Staff = Annotated[AuthContext, Depends(require_role(UserRole.warehouse_worker, UserRole.courier))]
+
+
+def _claimed_orders(rows) -> list[ClaimedOrderDTO]:
+    return [ClaimedOrderDTO(uuid=uuid, created_at=created_at, claimed_until=claimed_until)
+            for uuid, created_at, claimed_until in rows]
+
+
+@router.post('/warehouse/claim', response_model=list[ClaimedOrderDTO])
+async def claim_orders_to_collect(
+        auth: WarehouseWorker,
+        db_session: Annotated[AsyncSession, Depends(get_async_session)],
+        limit: Annotated[int, Query(ge=1, le=100)] = 1
+):
+    rows = await claim_orders(
+        db_session, auth.user_uuid, OrderStatus.collecting, lease, limit, warehouse_uuid=auth.warehouse_uuid
+    )
+    return _claimed_orders(rows)
+
+
+@router.post('/warehouse/complete', response_model=list[UUID])
+async def complete_collecting(
+        auth: WarehouseWorker,
+        order_uuids: Annotated[list[UUID], Body(embed=True)],
+        db_session: Annotated[AsyncSession, Depends(get_async_session)]
+):
+    return await transition_claimed_orders(
+        db_session, auth.user_uuid, order_uuids, OrderStatus.collecting, OrderStatus.delivering
+    )
+
+
+@router.post('/delivery/claim', response_model=list[ClaimedOrderDTO])
+async def claim_orders_to_deliver(
+        auth: Courier,
+        db_session: Annotated[AsyncSession, Depends(get_async_session)],
+        warehouse_uuid: Annotated[UUID | None, Query()] = None,
+        limit: Annotated[int, Query(ge=1, le=100)] = 1
+):
+    rows = await claim_orders(
+        db_session, auth.user_uuid, OrderStatus.delivering, lease, limit, warehouse_uuid=warehouse_uuid,
+        values={'delivery_car_uuid': auth.delivery_car_uuid}
+    )
+    return _claimed_orders(rows)
+
+
+@router.post('/delivery/complete', response_model=list[UUID])
+async def complete_delivery(
+        auth: Courier,
+        order_uuids: Annotated[list[UUID], Body(embed=True)],
+        db_session: Annotated[AsyncSession, Depends(get_async_session)]
+):
+    return await transition_claimed_orders(
+        db_session, auth.user_uuid, order_uuids, OrderStatus.delivering, OrderStatus.done
+    )
+
+
+@router.post('/extend', response_model=list[UUID])
+async def extend(
+        auth: Staff,
+        order_uuids: Annotated[list[UUID], Body(embed=True)],
+        db_session: Annotated[AsyncSession, Depends(get_async_session)]
+):
+    return await extend_claims(db_session, auth.user_uuid, order_uuids, lease)
+
+
+@router.post('/release', response_model=None)
+async def release(
+        auth: Staff,
+        order_uuids: Annotated[list[UUID], Body(embed=True)],
+        db_session: Annotated[AsyncSession, Depends(get_async_session)]
+):
+    await release_claims(db_session, auth.user_uuid, order_uuids)
@@ -0,0 +1,91 @@
+import datetime
+from collections.abc import Sequence
+from uuid import UUID
+
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Order, OrderStatus
+from orders.db import notify_status_changed, publish_committed_status_change
+
+
+def _not_claimed():
+    return or_(Order.claimed_until.is_(None), Order.claimed_until < func.now())
+
+
+async def claim_orders(
+        session: AsyncSession,
+        user_uuid: UUID,
+        status: OrderStatus,
+        lease: datetime.timedelta,
+        limit: int,
+        warehouse_uuid: UUID | None = None,
+        values: dict | None = None
+) -> list[tuple[UUID, datetime.datetime, datetime.datetime]]:
+    """Claims up to `limit` oldest unclaimed orders with given status. Rows locked by concurrent claims are skipped
+    (FOR UPDATE SKIP LOCKED), so workers never wait for each other and never get the same order"""
+    candidates = select(Order.uuid).where(Order.status == status, _not_claimed())
+    if warehouse_uuid is not None:
+        candidates = candidates.where(Order.warehouse_uuid == warehouse_uuid)
+    candidates = candidates.order_by(Order.created_at).limit(limit).with_for_update(skip_locked=True)
+    statement = update(Order) \
+        .where(Order.uuid.in_(candidates)) \
+        .values({'claimed_by_uuid': user_uuid, 'claimed_until': func.now() + lease, **(values or {})}) \
+        .returning(Order.uuid, Order.created_at, Order.claimed_until) \
+        .execution_options(synchronize_session=False)
+    res = await session.execute(statement)
+    orders = [(row[0], row[1], row[2]) for row in res]
+    await session.commit()
+    return orders
+
+
+async def transition_claimed_orders(
+        session: AsyncSession,
+        user_uuid: UUID,
+        order_uuids: Sequence[UUID],
+        from_status: OrderStatus,
+        to_status: OrderStatus
+) -> list[UUID]:
+    """Moves orders claimed by user (with not expired claim) from one status to another and releases them. Returns
+    uuids of orders that were moved"""
+    statement = update(Order) \
+        .where(Order.uuid.in_(order_uuids),
+               Order.status == from_status,
+               Order.claimed_by_uuid == user_uuid,
+               Order.claimed_until >= func.now()) \
+        .values({'status': to_status, 'claimed_by_uuid': None, 'claimed_until': None}) \
+        .returning(Order.uuid) \
+        .execution_options(synchronize_session=False)
+    res = await session.execute(statement)
+    moved = list(res.scalars())
+    await notify_status_changed(session, moved, to_status)
+    await session.commit()
+    await publish_committed_status_change(moved, to_status)
+    return moved
+
+
+async def extend_claims(
+        session: AsyncSession,
+        user_uuid: UUID,
+        order_uuids: Sequence[UUID],
+        lease: datetime.timedelta
+) -> list[UUID]:
+    statement = update(Order) \
+        .where(Order.uuid.in_(order_uuids), Order.claimed_by_uuid == user_uuid, Order.claimed_until >= func.now()) \
+        .values({'claimed_until': func.now() + lease}) \
+        .returning(Order.uuid) \
+        .execution_options(synchronize_session=False)
+    res = await session.execute(statement)
+    extended = list(res.scalars())
+    await session.commit()
+    return extended
+
+
+async def release_claims(session: AsyncSession, user_uuid: UUID, order_uuids: Sequence[UUID]) -> None:
+    await session.execute(
+        update(Order)
+        .where(Order.uuid.in_(order_uuids), Order.claimed_by_uuid == user_uuid)
+        .values({'claimed_by_uuid': None, 'claimed_until': None})
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
@@ -0,0 +1,10 @@
+import datetime
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class ClaimedOrderDTO(BaseModel):
+    uuid: UUID
+    created_at: datetime.datetime
+    claimed_until: datetime.datetime
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-of-at-least-32-bytes')
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_session() -> type[FakeSession]:
+    """Replacement for db.new_session in modules whose db functions are patched by the test"""
+    return FakeSession
@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+import uuid
+
+import pytest
+
+from accounts import dependencies
+from db.models import UserRole
+from utils import encode_jwt
+
+
+@pytest.fixture
+def claims(monkeypatch, fake_session) -> tuple[dict, list]:
+    """Current claims of users by uuid, and list where every read of them from database is recorded"""
+    claims = {}
+    reads = []
+
+    async def get_user_claims(session, user_uuid):
+        reads.append(user_uuid)
+        return claims.get(user_uuid)
+    monkeypatch.setattr(dependencies, 'new_session', fake_session)
+    monkeypatch.setattr(dependencies, 'get_user_claims', get_user_claims)
+    monkeypatch.setattr(dependencies, '_claims_cache', {})
+    return claims, reads
+
+
+def token(user_uuid: uuid.UUID, role: str = 'customer', token_version: int = 0) -> str:
+    return encode_jwt({'user_uuid': user_uuid.hex, 'role': role, 'token_version': token_version},
+                      datetime.timedelta(minutes=5))
+
+
+def test_valid_token_is_checked_once_per_cache_ttl(claims):
+    claims, reads = claims
+    user_uuid = uuid.uuid4()
+    claims[user_uuid] = (0, UserRole.customer, None, None)
+    for _ in range(3):
+        context = asyncio.run(dependencies.get_auth_context(token(user_uuid)))
+        assert context.user_uuid == user_uuid and context.role == UserRole.customer
+    assert reads == [user_uuid]
+
+
+def test_token_with_old_version_or_role_is_rejected(claims, monkeypatch):
+    claims, _ = claims
+    user_uuid = uuid.uuid4()
+    claims[user_uuid] = (1, UserRole.customer, None, None)
+    assert asyncio.run(dependencies.get_auth_context(token(user_uuid, token_version=0))) is None
+    monkeypatch.setattr(dependencies, '_claims_cache', {})
+    claims[user_uuid] = (0, UserRole.customer, None, None)
+    assert asyncio.run(dependencies.get_auth_context(token(user_uuid, role='warehouse_worker'))) is None
+
+
+def test_token_of_deleted_user_is_rejected(claims):
+    assert asyncio.run(dependencies.get_auth_context(token(uuid.uuid4()))) is None
+
+
+def test_malformed_claims_are_unauthorized(claims):
+    _, reads = claims
+    assert asyncio.run(dependencies.get_auth_context(token(uuid.uuid4(), role='no_such_role'))) is None
+    bad_uuid = encode_jwt({'user_uuid': 'x', 'role': 'customer', 'token_version': 0}, datetime.timedelta(minutes=5))
+    assert asyncio.run(dependencies.get_auth_context(bad_uuid)) is None
+    assert reads == []
@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+
+import pytest
+
+import delivery
+from delivery.coverage import CoverageIndex, WarehouseState
+
+
+@pytest.fixture(autouse=True)
+def reset_coverage(monkeypatch, fake_session):
+    monkeypatch.setattr(delivery, 'coverage', None)
+    monkeypatch.setattr(delivery, '_index', None)
+    monkeypatch.setattr(delivery, 'new_session', fake_session)
+
+
+def set_warehouses(monkeypatch, warehouses: dict | Exception):
+    async def get_warehouses_state(session):
+        if isinstance(warehouses, Exception):
+            raise warehouses
+        return warehouses
+    monkeypatch.setattr(delivery, 'get_warehouses_state', get_warehouses_state)
+
+
+async def start() -> None:
+    refresh = await delivery.start_coverage()
+    refresh.cancel()
+
+
+def test_coverage_is_built_from_warehouses(monkeypatch):
+    warehouse_uuid = uuid.uuid4()
+    set_warehouses(monkeypatch, {warehouse_uuid: WarehouseState(37.6, 55.75, 2)})
+    asyncio.run(start())
+    assert delivery.coverage.estimate(37.61, 55.75).warehouse_uuid == warehouse_uuid
+    assert delivery.coverage.estimate(30.0, 50.0) is None
+
+
+def test_coverage_is_unavailable_until_first_sync(monkeypatch):
+    set_warehouses(monkeypatch, ConnectionRefusedError())
+    asyncio.run(start())
+    assert delivery.coverage is None
+    set_warehouses(monkeypatch, {uuid.uuid4(): WarehouseState(37.6, 55.75, 2)})
+    asyncio.run(delivery.sync_coverage())
+    assert delivery.coverage is not None
+
+
+# eta = 20 minutes handling + 60 / cars waiting for a car + 2 minutes per km, within 15 km
+A, B = uuid.uuid4(), uuid.uuid4()
+A_STATE = WarehouseState(37.60, 55.75, 1)
+B_STATE = WarehouseState(37.70, 55.75, 1)  # ~6.3 km east of A
+
+
+def index(warehouses: dict) -> CoverageIndex:
+    coverage = CoverageIndex(radius_km=15, speed_kmh=30, handling_minutes=20, dispatch_minutes=60)
+    coverage.sync(warehouses)
+    return coverage
+
+
+def test_fastest_of_overlapping_warehouses_is_chosen():
+    coverage = index({A: A_STATE, B: B_STATE})
+    assert coverage.estimate(37.62, 55.75).warehouse_uuid == A
+    assert coverage.estimate(37.68, 55.75).warehouse_uuid == B
+    assert coverage.estimate(37.62, 55.75).eta_minutes == pytest.approx(20 + 60 + 2 * 1.25, abs=1)
+
+
+def test_more_cars_make_warehouse_faster_for_cells_nearer_to_other_one():
+    coverage = index({A: A_STATE, B: B_STATE})
+    assert coverage.estimate(37.63, 55.75).warehouse_uuid == A
+    assert coverage.sync({A: A_STATE, B: B_STATE._replace(cars=10)}) == 1
+    assert coverage.estimate(37.63, 55.75).warehouse_uuid == B
+    assert coverage.estimate(37.63, 55.75).eta_minutes == pytest.approx(20 + 6 + 2 * 4.4, abs=1)
+
+
+@pytest.mark.parametrize('b_state', [B_STATE._replace(cars=0), None])
+def test_warehouse_without_cars_or_removed_covers_nothing(b_state):
+    coverage = index({A: A_STATE, B: B_STATE})
+    assert coverage.estimate(37.85, 55.75).warehouse_uuid == B  # ~15.7 km from A
+    coverage.sync({A: A_STATE} if b_state is None else {A: A_STATE, B: b_state})
+    assert coverage.estimate(37.85, 55.75) is None
+    assert coverage.estimate(37.68, 55.75).warehouse_uuid == A
+    assert all(estimate.warehouse_uuid == A for estimates in coverage._cells.values() for estimate in estimates)
+
+
+def test_copy_is_changed_independently():
+    coverage = index({A: A_STATE})
+    copy = coverage.copy()
+    copy.sync({A: A_STATE, B: B_STATE})
+    copy.sync({A: A_STATE._replace(cars=0), B: B_STATE})
+    assert coverage.estimate(37.62, 55.75).warehouse_uuid == A
+    assert coverage.estimate(37.85, 55.75) is None
+    assert copy.estimate(37.62, 55.75).warehouse_uuid == B
@@ -0,0 +1,132 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from idempotency import IdempotencyMiddleware, InMemoryIdempotencyStore, _hash
+
+
+class App:
+    """App with counted handlers; `release` lets the slow handler finish"""
+
+    def __init__(self, store: InMemoryIdempotencyStore):
+        self.store = store
+        self.calls = []
+        self.release = asyncio.Event()
+        app = FastAPI()
+
+        @app.post('/items')
+        async def add(item: dict):
+            self.calls.append('add')
+            return {'call': len(self.calls), **item}
+
+        @app.post('/slow')
+        async def slow():
+            self.calls.append('slow')
+            await self.release.wait()
+            return {}
+
+        @app.post('/fails')
+        async def fails():
+            self.calls.append('fails')
+            raise HTTPException(status_code=503)
+
+        @app.post('/crashes')
+        async def crashes():
+            self.calls.append('crashes')
+            raise RuntimeError('handler failed')
+
+        @app.post('/accounts/login')
+        async def login():
+            self.calls.append('login')
+            return {'access_token': 'secret'}
+
+        app.add_middleware(IdempotencyMiddleware, store=store, exclude_paths=['/accounts/login'])
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+
+KEY = {'Idempotency-Key': 'key'}
+
+
+@pytest.fixture
+def app() -> App:
+    return App(InMemoryIdempotencyStore(ttl=3600, max_keys=100, lease=60))
+
+
+def test_retry_gets_saved_response(app):
+    async def check():
+        first = await app.client.post('/items', json={'a': 1}, headers=KEY)
+        retry = await app.client.post('/items', json={'a': 1}, headers=KEY)
+        assert app.calls == ['add']
+        assert retry.status_code == first.status_code == 200
+        assert retry.json() == first.json() == {'call': 1, 'a': 1}
+        assert retry.headers['idempotent-replayed'] == 'true'
+    asyncio.run(check())
+
+
+def test_requests_without_key_or_of_other_users_are_not_replayed(app):
+    async def check():
+        await app.client.post('/items', json={'a': 1})
+        await app.client.post('/items', json={'a': 1})
+        await app.client.post('/items', json={'a': 1}, headers={**KEY, 'Authorization': 'Bearer user1'})
+        await app.client.post('/items', json={'a': 1}, headers={**KEY, 'Authorization': 'Bearer user2'})
+        assert app.calls == ['add'] * 4
+    asyncio.run(check())
+
+
+def test_key_reused_with_different_request_gets_422(app):
+    async def check():
+        await app.client.post('/items', json={'a': 1}, headers=KEY)
+        response = await app.client.post('/items', json={'a': 2}, headers=KEY)
+        assert response.status_code == 422
+        assert app.calls == ['add']
+    asyncio.run(check())
+
+
+def test_retry_while_request_is_handled_gets_409(app):
+    async def check():
+        first = asyncio.create_task(app.client.post('/slow', headers=KEY))
+        while not app.calls:
+            await asyncio.sleep(0)
+        retry = await app.client.post('/slow', headers=KEY)
+        app.release.set()
+        assert retry.status_code == 409
+        assert (await first).status_code == 200
+        assert app.calls == ['slow']
+    asyncio.run(check())
+
+
+def test_request_abandoned_by_killed_worker_is_run_again_after_lease(app):
+    async def check():
+        # worker was killed while handling the request, so neither finish nor discard was called
+        app.store.lease = 0
+        await app.store.start(_hash(b'', b'key'), _hash(b'POST', b'/slow', b'', b''))
+        await asyncio.sleep(0.01)
+        app.release.set()
+        response = await app.client.post('/slow', headers=KEY)
+        assert response.status_code == 200
+        assert app.calls == ['slow']
+    asyncio.run(check())
+
+
+def test_server_errors_are_not_saved(app):
+    async def check():
+        assert (await app.client.post('/fails', headers=KEY)).status_code == 503
+        assert (await app.client.post('/fails', headers=KEY)).status_code == 503
+        with pytest.raises(RuntimeError):
+            await app.client.post('/crashes', headers=KEY | {'Authorization': 'other'})
+        with pytest.raises(RuntimeError):
+            await app.client.post('/crashes', headers=KEY | {'Authorization': 'other'})
+        assert app.calls == ['fails', 'fails', 'crashes', 'crashes']
+    asyncio.run(check())
+
+
+def test_excluded_paths_are_not_saved(app):
+    async def check():
+        await app.client.post('/accounts/login', headers=KEY)
+        response = await app.client.post('/accounts/login', headers=KEY)
+        assert 'idempotent-replayed' not in response.headers
+        assert app.calls == ['login', 'login']
+        assert not app.store._records
+    asyncio.run(check())
@@ -0,0 +1,61 @@
+import smtplib
+
+import pytest
+
+import config
+import mail
+
+
+class FakeSMTP:
+    """Records sent messages; `disconnected` makes the next send fail as after server closed idle connection"""
+    connections = []
+
+    def __init__(self, host, port):
+        self.sent = []
+        self.disconnected = False
+        FakeSMTP.connections.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, email, password):
+        pass
+
+    def send_message(self, message):
+        if self.disconnected:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(message['To'])
+
+    def quit(self):
+        if self.disconnected:
+            raise smtplib.SMTPServerDisconnected('please run connect() first')
+
+
+@pytest.fixture(autouse=True)
+def fake_smtp(monkeypatch):
+    FakeSMTP.connections.clear()
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    monkeypatch.setattr(config, 'SMTP_HOST', 'smtp.example.com')
+    monkeypatch.setattr(mail, 'smtp', None)
+
+
+def test_connects_lazily_once():
+    mail.send_email('a@example.com', 'text')
+    mail.send_email(['b@example.com'], 'text')
+    assert len(FakeSMTP.connections) == 1
+    assert FakeSMTP.connections[0].sent == ['a@example.com', 'b@example.com']
+
+
+def test_reconnects_when_server_dropped_connection():
+    mail.send_email('a@example.com', 'text')
+    FakeSMTP.connections[0].disconnected = True
+    mail.send_email('b@example.com', 'text')
+    assert len(FakeSMTP.connections) == 2
+    assert FakeSMTP.connections[1].sent == ['b@example.com']
+
+
+def test_quit_ignores_dropped_connection():
+    mail.init_smtp()
+    FakeSMTP.connections[0].disconnected = True
+    mail.quit_smtp()
+    assert mail.smtp is None
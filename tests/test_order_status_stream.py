@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+
+import pytest
+
+import config
+import orders
+from db.models import OrderStatus
+from orders import events
+
+
+@pytest.fixture
+def hub(monkeypatch, fake_session):
+    hub = events.OrderStatusHub(events.InMemoryPubSub())
+    monkeypatch.setattr(events, 'hub', hub)
+    monkeypatch.setattr(orders, 'new_session', fake_session)
+    return hub
+
+
+def set_order_status(monkeypatch, order_status: OrderStatus | None):
+    async def get_order_status(session, order_uuid, user_uuid):
+        return order_status
+    monkeypatch.setattr(orders, 'get_order_status', get_order_status)
+
+
+async def read_stream(hub: events.OrderStatusHub, order_uuid: uuid.UUID, published: list[OrderStatus]) -> list[str]:
+    await hub.start()
+    stream = orders._status_stream(order_uuid, uuid.uuid4())
+    chunks = [await anext(stream)]  # subscribes and sends current status
+    for order_status in published:
+        await hub.publish_committed(order_uuid, order_status)
+    chunks += [chunk async for chunk in stream]
+    return chunks
+
+
+def test_stream_sends_changes_until_final_status(hub, monkeypatch):
+    set_order_status(monkeypatch, OrderStatus.collecting)
+    order_uuid = uuid.uuid4()
+    chunks = asyncio.run(read_stream(
+        hub, order_uuid, [OrderStatus.collecting, OrderStatus.delivering, OrderStatus.done]
+    ))
+    assert chunks == ['data: collecting\n\n', 'data: delivering\n\n', 'data: done\n\n']
+    assert not hub._subscribers
+
+
+def test_stream_ignores_other_orders(hub, monkeypatch):
+    set_order_status(monkeypatch, OrderStatus.delivering)
+    order_uuid = uuid.uuid4()
+
+    async def read():
+        await hub.start()
+        stream = orders._status_stream(order_uuid, uuid.uuid4())
+        first = await anext(stream)
+        await hub.publish_committed(uuid.uuid4(), OrderStatus.done)
+        await hub.publish_committed(order_uuid, OrderStatus.canceled)
+        return [first] + [chunk async for chunk in stream]
+
+    assert asyncio.run(read()) == ['data: delivering\n\n', 'data: canceled\n\n']
+
+
+def test_stream_sends_heartbeat(hub, monkeypatch):
+    set_order_status(monkeypatch, OrderStatus.collecting)
+    monkeypatch.setattr(config, 'ORDER_EVENTS_HEARTBEAT', 0.01)
+
+    async def read():
+        stream = orders._status_stream(uuid.uuid4(), uuid.uuid4())
+        chunks = [await anext(stream), await anext(stream)]
+        await stream.aclose()
+        return chunks
+
+    assert asyncio.run(read()) == ['data: collecting\n\n', ': ping\n\n']
+
+
+def test_stream_of_deleted_order_is_empty(hub, monkeypatch):
+    set_order_status(monkeypatch, None)
+
+    async def read():
+        return [chunk async for chunk in orders._status_stream(uuid.uuid4(), uuid.uuid4())]
+
+    assert asyncio.run(read()) == []
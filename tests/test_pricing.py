@@ -0,0 +1,96 @@
+import asyncio
+import uuid
+
+import pytest
+
+from pricing import Line, Price, PercentDiscount, FixedDiscount, apply_percent, price_lines, price_carts
+from pricing.db import get_promo_code_rules
+from db.models import PromoCode
+
+
+def line(price: int, discount: int = 0, amount: int = 1) -> Line:
+    return Line(uuid.uuid4(), price, discount, amount)
+
+
+@pytest.mark.parametrize('value, percent, expected', [
+    (1, 50, 1),  # 0.5
+    (3, 50, 2),  # 1.5
+    (5, 10, 5),  # 4.5
+    (1005, 10, 905),  # 904.5
+    (999, 33, 669),  # 669.33
+    (1000, 0, 1000),
+    (1000, 100, 0),
+])
+def test_apply_percent_rounds_half_up(value, percent, expected):
+    assert apply_percent(value, percent) == expected
+
+
+def test_product_discount_is_rounded_once_per_line():
+    # 3 * 5 * 0.9 = 13.5 -> 14; rounding every unit (4.5 -> 5) would give 15
+    price = price_lines([line(5, discount=10, amount=3)])
+    assert price == Price(subtotal=15, products_total=14, total=14)
+    assert price.discount == 1
+
+
+def test_lines_are_summed():
+    price = price_lines([line(1000, amount=2), line(999, discount=33), line(5, discount=10, amount=3)])
+    assert price == Price(subtotal=2000 + 999 + 15, products_total=2000 + 669 + 14, total=2000 + 669 + 14)
+
+
+def test_rules_are_applied_in_order_after_product_discounts():
+    lines = [line(11000, discount=10)]  # products_total 9900
+    assert price_lines(lines, [PercentDiscount(10), FixedDiscount(500)]).total == 8410
+    assert price_lines(lines, [FixedDiscount(500), PercentDiscount(10)]).total == 8460
+
+
+def test_min_total_is_compared_with_total_after_previous_rules():
+    assert PercentDiscount(10, min_total=10000).apply(9999) == 9999
+    assert PercentDiscount(10, min_total=10000).apply(10000) == 9000
+    assert FixedDiscount(500, min_total=10000).apply(9999) == 9999
+    lines = [line(10000)]
+    assert price_lines(lines, [FixedDiscount(1), PercentDiscount(10, min_total=10000)]).total == 9999
+
+
+def test_fixed_discount_does_not_make_total_negative():
+    price = price_lines([line(3000)], [FixedDiscount(5000)])
+    assert price.total == 0
+    assert price.discount == 3000
+
+
+def test_price_carts_prices_every_cart_with_same_rules():
+    carts = {uuid.uuid4(): [line(1000)], uuid.uuid4(): [line(2000, amount=2)]}
+    prices = price_carts(carts, iter([PercentDiscount(10)]))
+    assert [price.total for price in prices.values()] == [900, 3600]
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class PromoCodeSession:
+    """Returns given promo code from any query"""
+
+    def __init__(self, promo_code: PromoCode | None):
+        self.promo_code = promo_code
+
+    async def execute(self, statement):
+        return FakeResult(self.promo_code)
+
+
+def test_no_promo_code_gives_no_rules():
+    assert asyncio.run(get_promo_code_rules(PromoCodeSession(None), None)) == ()
+
+
+def test_unknown_promo_code_gives_none():
+    assert asyncio.run(get_promo_code_rules(PromoCodeSession(None), 'UNKNOWN')) is None
+
+
+def test_promo_code_gives_its_rule():
+    percent = PromoCode(code='TEN', percent=10, amount=None, min_total=5000)
+    fixed = PromoCode(code='FIVE', percent=None, amount=500, min_total=0)
+    assert asyncio.run(get_promo_code_rules(PromoCodeSession(percent), 'TEN')) == (PercentDiscount(10, 5000),)
+    assert asyncio.run(get_promo_code_rules(PromoCodeSession(fixed), 'FIVE')) == (FixedDiscount(500, 0),)
@@ -0,0 +1,311 @@
+"""Query plans of database access functions.
+
+Needs local postgres with postgis, tests are skipped if it is not available. Connection settings are taken from
+environment, as for the app; database QUERY_PLANS_DATABASE (default internetshop_query_plans) must exist and is
+recreated from models and seeded with QUERY_PLANS_SCALE (default 20000) rows per table. Every db function is called
+inside a transaction that is rolled back, and every statement it executes is explained with EXPLAIN (FORMAT JSON).
+Cost and row estimates are printed (run pytest with -s to see them). Sequential scan of a large table (unless scanned
+table or partition has fewer than SMALL_RELATION_PAGES pages) fails the test, index that would be used instead is
+proposed as alembic operation.
+"""
+import asyncio
+import datetime
+import json
+import os
+import re
+from collections.abc import Awaitable, Callable
+from typing import NamedTuple
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import accounts.db
+import cart.db
+import delivery.db
+import idempotency.db
+import orders.db
+import pricing.db
+import recommendations.db
+import staff.db
+from db import SQLALCHEMY_DB_URL
+from db.models import Base, OrderStatus
+from idempotency import IdempotencyRecord
+from orders.partitions import create_partitions, month_start, add_months
+
+LARGE_TABLES = {'users', 'products', 'product_user', 'user_favorite_products', 'orders', 'product_order',
+                'idempotency_keys'}
+# sequential scan of relation smaller than this is cheaper than index scan, planner chooses it on purpose (e.g. for
+# partitions of next months or when scale is small)
+SMALL_RELATION_PAGES = 100
+EXPLAINABLE = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'}
+
+SEED = [
+    "INSERT INTO product_types (title) VALUES ('type')",
+    "INSERT INTO delivery_cars SELECT gen_random_uuid() FROM generate_series(1, 20)",
+    "INSERT INTO warehouses (address) "
+    "SELECT ST_SetSRID(ST_MakePoint(random() * 10, random() * 10), 4326) FROM generate_series(1, 20)",
+    "INSERT INTO products (price, title, description, type_uuid) "
+    "SELECT 100 + i, 'product ' || i, '', (SELECT uuid FROM product_types LIMIT 1) FROM generate_series(1, :n) AS i",
+    "INSERT INTO users (full_name, email, password_hash) "
+    "SELECT 'user ' || i, 'user' || i || '@example.com', 'hash' FROM generate_series(1, :n) AS i",
+    "WITH u AS (SELECT uuid, row_number() OVER () AS rn FROM users), "
+    "p AS (SELECT uuid, row_number() OVER () AS rn FROM products) "
+    "INSERT INTO product_user (product_uuid, user_uuid, amount) "
+    "SELECT p.uuid, u.uuid, k FROM u CROSS JOIN generate_series(1, 5) AS k "
+    "JOIN p ON p.rn = (u.rn * 7 + k * 13) % :n + 1",
+    "WITH u AS (SELECT uuid, row_number() OVER () AS rn FROM users), "
+    "p AS (SELECT uuid, row_number() OVER () AS rn FROM products) "
+    "INSERT INTO user_favorite_products (user_uuid, product_uuid) "
+    "SELECT u.uuid, p.uuid FROM u CROSS JOIN generate_series(1, 3) AS k JOIN p ON p.rn = (u.rn * 11 + k * 17) % :n + 1",
+    "WITH u AS (SELECT uuid, row_number() OVER () AS rn FROM users), "
+    "w AS (SELECT uuid, row_number() OVER () AS rn FROM warehouses) "
+    "INSERT INTO orders (user_uuid, status, price, created_at, deliver_address, charge_id, warehouse_uuid) "
+    "SELECT u.uuid, "
+    "(ARRAY['collecting', 'delivering', 'done', 'done', 'done', 'canceled'])[u.rn % 6 + 1]::orderstatus, "
+    "1000, now() - (u.rn % 360) * interval '1 day', ST_SetSRID(ST_MakePoint(0, 0), 4326), 'charge', w.uuid "
+    "FROM u JOIN w ON w.rn = u.rn % 20 + 1",
+    "WITH o AS (SELECT uuid, created_at, row_number() OVER () AS rn FROM orders), "
+    "p AS (SELECT uuid, row_number() OVER () AS rn FROM products) "
+    "INSERT INTO product_order (product_uuid, order_uuid, order_created_at, amount) "
+    "SELECT p.uuid, o.uuid, o.created_at, 1 FROM o CROSS JOIN generate_series(1, 3) AS k "
+    "JOIN p ON p.rn = (o.rn * 5 + k * 19) % :n + 1",
+    "INSERT INTO promo_codes (code, percent, min_total) SELECT 'CODE' || i, 10, 0 FROM generate_series(1, 100) AS i",
+    "INSERT INTO idempotency_keys (key, request_hash, status_code, headers, body, expires_at) "
+    "SELECT md5(i::text) || md5(i::text), md5(i::text), 200, '[]', '', now() + (i % 48 - 24) * interval '1 hour' "
+    "FROM generate_series(1, :n) AS i",
+]
+
+
+class Sample(NamedTuple):
+    user_uuid: object
+    email: str
+    product_uuid: object  # in cart of user
+    other_product_uuid: object  # not in cart of user
+    order_uuid: object
+    order_user_uuid: object
+    warehouse_uuid: object
+    idempotency_key: str  # not expired
+
+
+class Case(NamedTuple):
+    name: str
+    call: Callable[[AsyncSession, Sample], Awaitable]
+    allow_seq_scan: bool = False  # for functions that read whole tables on purpose
+
+
+CASES = [
+    Case('accounts.db.get_user_by_email', lambda s, x: accounts.db.get_user_by_email(s, x.email)),
+    Case('accounts.db.user_with_email_exists', lambda s, x: accounts.db.user_with_email_exists(s, x.email)),
+    Case('accounts.db.get_user_by_uuid', lambda s, x: accounts.db.get_user_by_uuid(s, x.user_uuid)),
+    Case('accounts.db.get_user_claims', lambda s, x: accounts.db.get_user_claims(s, x.user_uuid)),
+    Case('accounts.db.create_user', lambda s, x: accounts.db.create_user(s, 'name', 'hash')),
+    Case('accounts.db.update_user_email', lambda s, x: accounts.db.update_user_email(s, x.user_uuid, 'new@e.com')),
+    Case('accounts.db.update_user_full_name', lambda s, x: accounts.db.update_user_full_name(s, x.user_uuid, 'n')),
+    Case('accounts.db.update_user_password', lambda s, x: accounts.db.update_user_password(s, x.user_uuid, 'h')),
+    Case('accounts.db.update_user_password_by_email',
+         lambda s, x: accounts.db.update_user_password_by_email(s, x.email, 'h')),
+    Case('cart.db.get_user_products', lambda s, x: cart.db.get_user_products(s, x.user_uuid)),
+    Case('cart.db.get_user_product_uuids', lambda s, x: cart.db.get_user_product_uuids(s, x.user_uuid)),
+    Case('cart.db.add_product_to_cart',
+         lambda s, x: cart.db.add_product_to_cart(s, x.other_product_uuid, x.user_uuid, 1)),
+    Case('cart.db.remove_product_from_cart',
+         lambda s, x: cart.db.remove_product_from_cart(s, x.product_uuid, x.user_uuid)),
+    Case('cart.db.change_amount', lambda s, x: cart.db.change_amount(s, x.product_uuid, x.user_uuid, 2)),
+    Case('pricing.db.get_cart_lines', lambda s, x: pricing.db.get_cart_lines(s, x.user_uuid)),
+    Case('pricing.db.get_carts_lines_with_products',
+         lambda s, x: pricing.db.get_carts_lines_with_products(s, [x.product_uuid])),
+    Case('pricing.db.get_promo_code_rules', lambda s, x: pricing.db.get_promo_code_rules(s, 'CODE1')),
+    Case('orders.db.get_order_status', lambda s, x: orders.db.get_order_status(s, x.order_uuid, x.order_user_uuid)),
+    Case('orders.db.get_orders_statuses', lambda s, x: orders.db.get_orders_statuses(s, [x.order_uuid])),
+    Case('orders.db.update_order_status',
+         lambda s, x: orders.db.update_order_status(s, x.order_uuid, OrderStatus.collecting)),
+    Case('staff.db.claim_orders', lambda s, x: staff.db.claim_orders(
+        s, x.user_uuid, OrderStatus.collecting, datetime.timedelta(minutes=5), 10, warehouse_uuid=x.warehouse_uuid
+    )),
+    Case('staff.db.transition_claimed_orders', lambda s, x: staff.db.transition_claimed_orders(
+        s, x.user_uuid, [x.order_uuid], OrderStatus.collecting, OrderStatus.delivering
+    )),
+    Case('idempotency.db.get_idempotency_record',
+         lambda s, x: idempotency.db.get_idempotency_record(s, x.idempotency_key)),
+    Case('idempotency.db.start_idempotency_key', lambda s, x: idempotency.db.start_idempotency_key(
+        s, x.idempotency_key, 'hash', datetime.timedelta(minutes=5)
+    )),
+    Case('idempotency.db.finish_idempotency_key', lambda s, x: idempotency.db.finish_idempotency_key(
+        s, x.idempotency_key, IdempotencyRecord('hash', 200, [], b''), datetime.timedelta(days=1)
+    )),
+    Case('idempotency.db.discard_idempotency_key',
+         lambda s, x: idempotency.db.discard_idempotency_key(s, x.idempotency_key)),
+    Case('idempotency.db.delete_expired_keys', lambda s, x: idempotency.db.delete_expired_keys(s)),
+    Case('delivery.db.get_warehouses_state',
+         lambda s, x: delivery.db.get_warehouses_state(s), allow_seq_scan=True),
+    Case('recommendations.db.get_order_baskets',
+         lambda s, x: recommendations.db.get_order_baskets(s), allow_seq_scan=True),
+    Case('recommendations.db.get_order_baskets (update)', lambda s, x: recommendations.db.get_order_baskets(
+        s, datetime.datetime.now() - datetime.timedelta(days=1), datetime.datetime.now()
+    )),
+    Case('recommendations.db.get_cart_baskets',
+         lambda s, x: recommendations.db.get_cart_baskets(s), allow_seq_scan=True),
+    Case('recommendations.db.get_favorites_baskets',
+         lambda s, x: recommendations.db.get_favorites_baskets(s), allow_seq_scan=True),
+]
+
+
+async def prepare_database(engine: AsyncEngine, scale: int) -> Sample:
+    async with engine.begin() as connection:
+        await connection.execute(text('CREATE EXTENSION IF NOT EXISTS postgis'))
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        await create_partitions(session, add_months(month_start(datetime.date.today()), -12), 14)
+        for statement in SEED:
+            await session.execute(text(statement), {'n': scale})
+        await session.commit()
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level='AUTOCOMMIT')
+        await connection.execute(text('ANALYZE'))
+        user_uuid, email = (await connection.execute(text('SELECT uuid, email FROM users LIMIT 1'))).first()
+        product_uuid = await connection.scalar(
+            text('SELECT product_uuid FROM product_user WHERE user_uuid = :u LIMIT 1'), {'u': user_uuid}
+        )
+        other_product_uuid = await connection.scalar(text(
+            'SELECT uuid FROM products WHERE uuid NOT IN (SELECT product_uuid FROM product_user WHERE user_uuid = :u) '
+            'LIMIT 1'
+        ), {'u': user_uuid})
+        order_uuid, order_user_uuid, warehouse_uuid = (await connection.execute(text(
+            "SELECT uuid, user_uuid, warehouse_uuid FROM orders WHERE status = 'collecting' LIMIT 1"
+        ))).first()
+        idempotency_key = await connection.scalar(
+            text('SELECT key FROM idempotency_keys WHERE expires_at > now() LIMIT 1')
+        )
+    return Sample(user_uuid, email, product_uuid, other_product_uuid, order_uuid, order_user_uuid, warehouse_uuid,
+                  idempotency_key)
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def table_of(relation: str) -> str:
+    return re.sub(r'_y\d{4}m\d{2}$', '', relation)  # partitions (see orders.partitions.partition_name)
+
+
+def propose_index(table: str, condition: str) -> str:
+    # casts (e.g. (email)::text, '...'::character varying, ::timestamp without time zone) and parentheses are removed,
+    # so only column names are left on the left side of equality
+    columns_condition = re.sub(r'::[a-z_]+(?: [a-z_]+)*(?:\[\])?', '', condition).replace('(', ' ').replace(')', ' ')
+    columns = list(dict.fromkeys(re.findall(r'(?:\w+\.)?(\w+) += ', columns_condition)))
+    if not columns:
+        return f'# no equality condition in {condition!r}, index can not be proposed'
+    return f"op.create_index('{table}_{'_'.join(columns)}_idx', '{table}', {columns!r}, unique=False)"
+
+
+async def explain_case(engine: AsyncEngine, case: Case, sample: Sample) -> list[str]:
+    """Prints plan summary of every statement of case, returns problems"""
+    statements = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        words = statement.split(None, 1)
+        if words and words[0].upper() in EXPLAINABLE:
+            statements.append((statement, parameters))
+
+    problems = []
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, join_transaction_mode='create_savepoint', expire_on_commit=False)
+        event.listen(connection.sync_connection, 'before_cursor_execute', capture)
+        try:
+            await case.call(session, sample)
+        finally:
+            event.remove(connection.sync_connection, 'before_cursor_execute', capture)
+        small = set(await connection.scalars(
+            text("SELECT relname FROM pg_class WHERE relkind = 'r' AND relpages < :pages"),
+            {'pages': SMALL_RELATION_PAGES}
+        ))
+        for statement, parameters in statements:
+            res = await connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+            plan = res.scalar()
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+            print(f'{case.name:<50} cost {plan["Total Cost"]:>10.2f}   rows {plan["Plan Rows"]:>8}   '
+                  f'{statement.split(None, 1)[0]}')
+            if case.allow_seq_scan:
+                continue
+            for node in plan_nodes(plan):
+                relation = node.get('Relation Name', '')
+                if node['Node Type'] != 'Seq Scan' or table_of(relation) not in LARGE_TABLES or relation in small:
+                    continue
+                table = table_of(relation)
+                condition = node.get('Filter', '')
+                problems.append(f'{case.name}: sequential scan on {relation} ({condition})\n'
+                                f'    proposed: {propose_index(table, condition)}')
+        await transaction.rollback()
+    return problems
+
+
+SCALE = int(os.environ.get('QUERY_PLANS_SCALE', 20_000))
+DATABASE = os.environ.get('QUERY_PLANS_DATABASE', 'internetshop_query_plans')
+
+
+def create_engine() -> AsyncEngine:
+    # every test runs its own event loop, so connections are not pooled between them
+    return create_async_engine(f'{SQLALCHEMY_DB_URL.rsplit("/", 1)[0]}/{DATABASE}', poolclass=NullPool)
+
+
+async def check_database() -> None:
+    engine = create_engine()
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text('CREATE EXTENSION IF NOT EXISTS postgis'))
+    finally:
+        await engine.dispose()
+
+
+async def seed_database() -> Sample:
+    engine = create_engine()
+    try:
+        return await prepare_database(engine, SCALE)
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope='module')
+def sample() -> Sample:
+    try:
+        asyncio.run(check_database())
+    except Exception as error:
+        pytest.skip(f'postgres with postgis is not available: {error}')
+    return asyncio.run(seed_database())
+
+
+async def explain(case: Case, sample: Sample) -> list[str]:
+    engine = create_engine()
+    try:
+        return await explain_case(engine, case, sample)
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize('case', CASES, ids=[case.name for case in CASES])
+def test_query_plan(case: Case, sample: Sample):
+    problems = asyncio.run(explain(case, sample))
+    assert not problems, 'regressions:\n' + '\n'.join(dict.fromkeys(problems))
+
+
+@pytest.mark.parametrize('table, condition, expected', [
+    ('users', "((email)::text = 'user@example.com'::text)", ['email']),
+    ('orders', "((status = 'collecting'::orderstatus) AND (warehouse_uuid = '0c4d'::uuid) AND "
+               "((claimed_until IS NULL) OR (claimed_until < now())))", ['status', 'warehouse_uuid']),
+    ('orders', "((created_at)::timestamp without time zone = '2026-01-01 00:00:00'::timestamp without time zone)",
+     ['created_at']),
+    ('product_user', '(product_user.user_uuid = $1)', ['user_uuid']),
+])
+def test_propose_index_takes_columns_of_equality_conditions(table, condition, expected):
+    assert propose_index(table, condition) == \
+        f"op.create_index('{table}_{'_'.join(expected)}_idx', '{table}', {expected!r}, unique=False)"
+
+
+def test_propose_index_without_equality_condition():
+    assert propose_index('orders', '(claimed_until < now())').startswith('# no equality condition')